@@ -1,21 +1,21 @@
-import mysql
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.api.deps import get_db_connection
+from app.api.deps import get_async_db_connection
+from app.core.executor import run_blocking
 from app.core.security import verify_password, create_access_token, verify_token
 from app.db.models.User import UserLogin, UserResponse, UserCreate, UserEdit
-from app.services.auth_service import AuthService
+from app.services.auth_service import AsyncAuthService
 
 router = APIRouter()
 
 
 @router.post("/login")
-async def login(user: UserLogin, db: mysql.connector.MySQLConnection = Depends(get_db_connection)):
+async def login(user: UserLogin, db=Depends(get_async_db_connection)):
     try:
-        users_service = AuthService(db)
-        db_user = users_service.get_user_by_email(user.email)
+        users_service = AsyncAuthService(db)
+        db_user = await users_service.get_user_by_email(user.email)
 
-        if db_user is None or not verify_password(user.password, db_user.get('password_hash')):
+        if db_user is None or not await run_blocking(verify_password, user.password, db_user.get('password_hash')):
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
         token = create_access_token(data={"id": db_user.get('id'), "name": db_user.get('name') + db_user.get('last_name')})
@@ -36,10 +36,10 @@ async def login(user: UserLogin, db: mysql.connector.MySQLConnection = Depends(g
 
 
 @router.post("/register", response_model=UserResponse)
-async def create_new_user(user: UserCreate, db: mysql.connector.MySQLConnection = Depends(get_db_connection)):
+async def create_new_user(user: UserCreate, db=Depends(get_async_db_connection)):
     try:
-        users_service = AuthService(db)
-        user_id = users_service.create_user(user)
+        users_service = AsyncAuthService(db)
+        user_id = await users_service.create_user(user)
         token = create_access_token(data={"id": user_id, "name": user.name + user.last_name})
 
         return UserResponse(
@@ -58,10 +58,10 @@ async def create_new_user(user: UserCreate, db: mysql.connector.MySQLConnection
 
 
 @router.patch("/edit", response_model=UserResponse, dependencies=[Depends(verify_token)])
-async def create_new_user(user: UserEdit, db: mysql.connector.MySQLConnection = Depends(get_db_connection)):
+async def create_new_user(user: UserEdit, db=Depends(get_async_db_connection)):
     try:
-        users_service = AuthService(db)
-        user_id = users_service.edit_user(user)
+        users_service = AsyncAuthService(db)
+        user_id = await users_service.edit_user(user)
         token = create_access_token(data={"id": user_id, "name": user.name + user.last_name})
 
         return UserResponse(
@@ -80,10 +80,10 @@ async def create_new_user(user: UserEdit, db: mysql.connector.MySQLConnection =
 
 # test endpoint
 @router.get("/users")
-async def get_users(db: mysql.connector.MySQLConnection = Depends(get_db_connection), token: str = Depends(verify_token)):
+async def get_users(db=Depends(get_async_db_connection), token: str = Depends(verify_token)):
     try:
-        users_service = AuthService(db)
+        users_service = AsyncAuthService(db)
 
-        return users_service.get_users()
+        return await users_service.get_users()
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,8 +1,17 @@
-from app.db.session import get_connection
+from contextlib import asynccontextmanager
 
-def get_db_connection():
-    connection = get_connection()
-    try:
+from app.db.async_session import get_async_pool
+
+
+@asynccontextmanager
+async def async_db_connection():
+    """Pooled connection for the queries of a handler that also runs CPU-bound work, which should not
+    keep a connection checked out while it waits for the executor."""
+    pool = await get_async_pool()
+    async with pool.connection() as connection:
+        yield connection
+
+
+async def get_async_db_connection():
+    async with async_db_connection() as connection:
         yield connection
-    finally:
-        connection.close()
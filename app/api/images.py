@@ -1,23 +1,212 @@
-import mysql
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException
+import asyncio
+import hashlib
+import uuid
+from typing import Literal, Optional, Tuple
 
-from app.api.deps import get_db_connection
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import async_db_connection
+from app.core.config import settings
+from app.core.executor import run_blocking, run_cpu_bound
 from app.core.security import verify_token
-from app.services.images_service import ImagesService
+from app.core.storage import get_storage
+from app.db.models.Image import ImageUploadResult
+from app.api.multipart import Part, iter_multipart
+from app.services.images_service import AsyncImagesService, classify_upload, get_image_key
+from app.services.overlay_cache import get_overlay_cache, render_overlay_jpeg
 
 router = APIRouter(
     dependencies=[Depends(verify_token)]
 )
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# a photo_id is never rewritten, so clients may keep it; private because it is per user
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+async def _read_upload(file: UploadFile) -> Tuple[bytes, str]:
+    # hashed chunk by chunk while it is read, so retries are recognised without a second pass
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        digest.update(chunk)
+        buffer.extend(chunk)
+    return bytes(buffer), digest.hexdigest()
+
+
 @router.post("/upload")
-async def upload_image(file: UploadFile = File(...), facial_expression: str = File(...), session_id: str = File(...), db: mysql.connector.MySQLConnection = Depends(get_db_connection)):
+async def upload_image(file: UploadFile = File(...), facial_expression: str = File(...), session_id: str = File(...)):
     try:
-        images_service = ImagesService(db)
-        result = images_service.classify_image(file)
+        image_bytes, content_hash = await _read_upload(file)
 
-        images_service.insert_images_db(result["image"], session_id, 'img_url?', facial_expression, False)
-        # images_service.insert_images_db(result["image_with_points"], session_id, 'img_url?', facial_expression, True)
+        # a retried upload already has its photo, landmarks and features stored
+        async with async_db_connection() as db:
+            if await AsyncImagesService(db).find_uploaded_image(session_id, facial_expression, content_hash):
+                return
+
+        result = await run_cpu_bound(classify_upload, image_bytes)
+
+        async with async_db_connection() as db:
+            await AsyncImagesService(db).insert_images_db(result["image"], session_id, f'/images/{result["image"]}',
+                                                          facial_expression, False, content_hash)
 
         return
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _classify_part(session_id: str, part: Part) -> ImageUploadResult:
+    async with async_db_connection() as db:
+        photo_id = await AsyncImagesService(db).find_uploaded_image(session_id, part.name, part.content_hash)
+    if photo_id:
+        return ImageUploadResult(facial_expression=part.name, status='duplicate', photo_id=photo_id)
+
+    result = await run_cpu_bound(classify_upload, part.content)
+    return ImageUploadResult(facial_expression=part.name, status='created', photo_id=result["image"])
+
+
+@router.post("/upload-session")
+async def upload_session_images(request: Request):
+    """All expressions of a session in one multipart request: a ``session_id`` field first, then one
+    file per expression whose field name is the expression. Each photo starts processing as soon as
+    its part has arrived; the new photos are inserted in one transaction."""
+    tasks = {}
+    try:
+        session_id = None
+        hashes = {}
+        results = []
+
+        async for part in iter_multipart(request):
+            if part.filename is None:
+                if part.name == 'session_id':
+                    session_id = part.content.decode('utf-8')
+                continue
+            if session_id is None:
+                raise ValueError("O campo session_id deve ser enviado antes das imagens.")
+            if part.name in tasks:
+                results.append(ImageUploadResult(facial_expression=part.name, status='error',
+                                                 error="Expressão enviada mais de uma vez."))
+                continue
+            hashes[part.name] = part.content_hash
+            tasks[part.name] = asyncio.create_task(_classify_part(session_id, part))
+
+        for facial_expression, task in tasks.items():
+            try:
+                results.append(await task)
+            except Exception as e:
+                results.append(ImageUploadResult(facial_expression=facial_expression, status='error', error=str(e)))
+
+        created = [item for item in results if item.status == 'created']
+        if created:
+            try:
+                async with async_db_connection() as db:
+                    await AsyncImagesService(db).insert_images_db_many([
+                        (item.photo_id, session_id, f'/images/{item.photo_id}', item.facial_expression, False,
+                         hashes[item.facial_expression])
+                        for item in created
+                    ])
+            except Exception as e:
+                for item in created:
+                    item.status, item.photo_id, item.error = 'error', None, str(e)
+
+        return results
+    except Exception as e:
+        for task in tasks.values():
+            task.cancel()
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Single ``bytes=`` range as inclusive (start, end); None serves the whole file (also for multi-range)."""
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, headers={"content-range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+async def _get_overlay(photo_id: str, detail: str, headers: dict):
+    cache = get_overlay_cache()
+    content = await run_blocking(cache.get, photo_id, detail)
+    if content is None:
+        content = await run_cpu_bound(render_overlay_jpeg, photo_id, detail)
+        if content is None:
+            raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+        await run_blocking(cache.put, photo_id, detail, content)
+    return Response(content, media_type="image/jpeg", headers=headers)
+
+
+@router.get("/{photo_id}")
+async def get_image(photo_id: str, request: Request, variant: Literal['original', 'preview', 'points'] = 'original', detail: Optional[Literal['full', 'contours']] = None, user: dict = Depends(verify_token)):
+    try:
+        try:
+            photo_id = str(uuid.UUID(photo_id))
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+
+        # released before the overlay may be rendered or the file streamed
+        async with async_db_connection() as db:
+            owns_image = await AsyncImagesService(db).user_owns_image(photo_id, user.get('id'))
+        if not owns_image:
+            raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+
+        if variant == 'points':
+            # rendered from immutable inputs, so the tag is known before anything is drawn
+            detail = detail or settings.OVERLAY_DETAIL
+            headers = {"etag": f'"{photo_id}-points-{detail}"', "cache-control": IMAGE_CACHE_CONTROL}
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match and _etag_matches(if_none_match, headers["etag"]):
+                return Response(status_code=304, headers=headers)
+            return await _get_overlay(photo_id, detail, headers)
+
+        key = await run_blocking(get_image_key, photo_id, variant)
+        if key is None:
+            raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+
+        storage = get_storage()
+        stored = await run_blocking(storage.stat, key)
+        headers = {
+            "etag": f'"{photo_id}-{variant}-{stored.size}-{int(stored.modified_at * 1000)}"',
+            "cache-control": IMAGE_CACHE_CONTROL,
+            "accept-ranges": "bytes",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, headers["etag"]):
+            return Response(status_code=304, headers=headers)
+
+        byte_range = None
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (if_range is None or if_range == headers["etag"]):
+            byte_range = _parse_range(range_header, stored.size)
+
+        if byte_range is None:
+            headers["content-length"] = str(stored.size)
+            return StreamingResponse(storage.stream(key), media_type="image/jpeg", headers=headers)
+
+        start, end = byte_range
+        headers["content-range"] = f"bytes {start}-{end}/{stored.size}"
+        headers["content-length"] = str(end - start + 1)
+        return StreamingResponse(storage.stream(key, start, end), status_code=206, media_type="image/jpeg",
+                                 headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
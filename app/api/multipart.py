@@ -0,0 +1,75 @@
+import hashlib
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+class Part(NamedTuple):
+    name: str
+    filename: Optional[str]
+    content: bytes
+    content_hash: str
+
+
+async def iter_multipart(request: Request) -> AsyncIterator[Part]:
+    """Yields the parts of a multipart/form-data body one by one, as soon as each is fully received.
+
+    File parts are hashed (SHA-256) while their chunks arrive.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Esperado multipart/form-data.")
+
+    completed: List[Part] = []
+    state = {}
+
+    def on_part_begin():
+        state.update(headers={}, field=b"", value=b"", data=bytearray(), digest=hashlib.sha256())
+
+    def on_header_field(data: bytes, start: int, end: int):
+        state["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"], state["value"] = b"", b""
+
+    def on_part_data(data: bytes, start: int, end: int):
+        chunk = data[start:end]
+        state["data"].extend(chunk)
+        state["digest"].update(chunk)
+
+    def on_part_end():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        filename = disposition.get(b"filename")
+        completed.append(Part(
+            name=disposition.get(b"name", b"").decode("utf-8"),
+            filename=filename.decode("utf-8") if filename is not None else None,
+            content=bytes(state["data"]),
+            content_hash=state["digest"].hexdigest(),
+        ))
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    async for chunk in request.stream():
+        parser.write(chunk)
+        while completed:
+            yield completed.pop(0)
+    parser.finalize()
+    while completed:
+        yield completed.pop(0)
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,11 +11,56 @@ class Settings(BaseSettings):
     database_user: str
     database_password: str
 
+    # applied to each of the two pools: the async one of the route handlers and the blocking one of
+    # session processing and background jobs
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # seconds after which an idle connection is replaced; keep it below MySQL's wait_timeout
+    DB_POOL_RECYCLE: float = 1800.0
+    DB_POOL_PRE_PING: bool = True
+
     SECRET_KEY: str
 
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    FACE_LANDMARKER_MODEL_PATH: str = "./face_landmarker_v2_with_blendshapes.task"
+    FACE_LANDMARKER_POOL_SIZE: int = 2
+    FACE_LANDMARKER_POOL_TIMEOUT: float = 30.0
+    # in-plane rotation, in degrees, above which the landmarks are detected again on the leveled crop
+    LANDMARKS_MAX_CARRIED_ROTATION: float = 15.0
+    # longest side, in pixels, of the copy landmarks are detected on and of the copy the stored crop is
+    # cut from (0: full resolution)
+    MAX_WORKING_RESOLUTION: int = 2048
+    MAX_STORED_RESOLUTION: int = 4096
+    OVERLAY_DETAIL: Literal["full", "contours"] = "full"
+    # local disk of each host, also with STORAGE_BACKEND=s3: overlays are re-rendered from storage on a miss
+    OVERLAY_CACHE_DIR: str = "app/cache/overlays"
+    OVERLAY_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    EXECUTOR_KIND: Literal["thread", "process"] = "thread"
+    EXECUTOR_MAX_WORKERS: int = 2
+    EXECUTOR_MAX_CONCURRENCY: int = 4
+
+    SESSION_JOB_WORKERS: int = 2
+
+    # "redis" is shared by all workers; "memory" is per worker process, so with more than one worker
+    # the others serve a reprocessed session's old result for up to RESULT_CACHE_TTL seconds
+    RESULT_CACHE_BACKEND: Literal["memory", "redis", "none"] = "none"
+    RESULT_CACHE_MAX_ENTRIES: int = 10000
+    RESULT_CACHE_TTL: float = 300.0
+    RESULT_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    STORAGE_LOCAL_ROOT: str = "app/assets"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+
     class Config:
         env_file = ".env"
 
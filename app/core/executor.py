@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+_semaphore = None
+_in_flight = 0
+_waiting = 0
+
+
+def get_executor() -> Executor:
+    """Pool for inference and image work, a thread or a process pool depending on EXECUTOR_KIND."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if settings.EXECUTOR_KIND == "process":
+                    # spawn instead of fork: the server process already runs threads (and maybe detectors)
+                    _executor = ProcessPoolExecutor(max_workers=settings.EXECUTOR_MAX_WORKERS,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+                elif settings.EXECUTOR_KIND == "thread":
+                    _executor = ThreadPoolExecutor(max_workers=settings.EXECUTOR_MAX_WORKERS,
+                                                   thread_name_prefix="cpu-bound")
+                else:
+                    raise ValueError(f"EXECUTOR_KIND invalido: {settings.EXECUTOR_KIND}")
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.EXECUTOR_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """Runs inference or image work on the executor; at most EXECUTOR_MAX_CONCURRENCY calls are submitted at once.
+
+    With EXECUTOR_KIND=process, ``func`` and its arguments must be picklable.
+    """
+    global _in_flight, _waiting
+    _waiting += 1
+    acquired = False
+    try:
+        async with _get_semaphore():
+            _waiting -= 1
+            acquired = True
+            _in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
+            finally:
+                _in_flight -= 1
+    finally:
+        if not acquired:
+            _waiting -= 1
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs blocking I/O (database, bcrypt) on the server thread pool."""
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+def get_executor_stats() -> dict:
+    return {
+        "kind": settings.EXECUTOR_KIND,
+        "max_workers": settings.EXECUTOR_MAX_WORKERS,
+        "max_concurrency": settings.EXECUTOR_MAX_CONCURRENCY,
+        "in_flight": _in_flight,
+        "waiting": _waiting,
+    }
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
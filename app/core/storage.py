@@ -0,0 +1,210 @@
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator, NamedTuple, Optional
+
+from starlette.concurrency import iterate_in_threadpool
+
+from app.core.config import settings
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # only needed with STORAGE_BACKEND=s3
+    boto3 = None
+    ClientError = None
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class StoredObject(NamedTuple):
+    size: int
+    modified_at: float
+
+
+def shard_key(key: str) -> str:
+    """``abcdef...jpg`` -> ``ab/cd/abcdef...jpg``: keys start with a uuid, so the prefixes spread evenly."""
+    return f"{key[:2]}/{key[2:4]}/{key}"
+
+
+class Storage(ABC):
+    """Asset storage (photos, previews, landmark and feature sidecars) addressed by flat keys like ``<photo_id>.jpg``.
+
+    The blocking methods are used by the services, which already run off the event loop;
+    ``stream`` is for request handlers.
+    """
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """Raises FileNotFoundError when the key does not exist."""
+
+    @abstractmethod
+    def write(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def stat(self, key: str) -> StoredObject:
+        """Raises FileNotFoundError when the key does not exist."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yields the bytes ``start..end`` (inclusive) of an object in chunks."""
+
+    async def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        async for chunk in iterate_in_threadpool(self.iter_range(key, start, end)):
+            yield chunk
+
+
+class LocalStorage(Storage):
+    """Files under ``root/ab/cd/<key>``; keys written before sharding are still read from ``root/<key>``."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, shard_key(key))
+
+    def _legacy_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _existing_path(self, key: str) -> str:
+        path = self._path(key)
+        if os.path.exists(path):
+            return path
+        legacy_path = self._legacy_path(key)
+        if os.path.exists(legacy_path):
+            return legacy_path
+        raise FileNotFoundError(key)
+
+    def read(self, key: str) -> bytes:
+        with open(self._existing_path(key), "rb") as file:
+            return file.read()
+
+    def write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written under a temporary name so a concurrent reader never sees a partial file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key)) or os.path.exists(self._legacy_path(key))
+
+    def stat(self, key: str) -> StoredObject:
+        stat_result = os.stat(self._existing_path(key))
+        return StoredObject(stat_result.st_size, stat_result.st_mtime)
+
+    def delete(self, key: str) -> None:
+        for path in (self._path(key), self._legacy_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._existing_path(key), "rb") as file:
+            file.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = file.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+
+class S3Storage(Storage):
+    """Objects in an S3-compatible bucket (``endpoint_url`` points it at MinIO or another local stand-in)."""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, region: str = None,
+                 access_key_id: str = None, secret_access_key: str = None):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requer o pacote boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region,
+                                   aws_access_key_id=access_key_id, aws_secret_access_key=secret_access_key)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{shard_key(key)}"
+
+    @staticmethod
+    def _is_not_found(error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def read(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key)
+            raise
+
+    def write(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stat(self, key: str) -> StoredObject:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key)
+            raise
+        return StoredObject(head["ContentLength"], head["LastModified"].timestamp())
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=byte_range)["Body"]
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key)
+            raise
+        try:
+            yield from body.iter_chunks(STREAM_CHUNK_SIZE)
+        finally:
+            body.close()
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if settings.STORAGE_BACKEND == "s3":
+                    # empty values in .env mean "use the boto3 defaults"
+                    _storage = S3Storage(settings.S3_BUCKET, settings.S3_PREFIX, settings.S3_ENDPOINT_URL or None,
+                                         settings.S3_REGION or None, settings.S3_ACCESS_KEY_ID or None,
+                                         settings.S3_SECRET_ACCESS_KEY or None)
+                elif settings.STORAGE_BACKEND == "local":
+                    _storage = LocalStorage(settings.STORAGE_LOCAL_ROOT)
+                else:
+                    raise ValueError(f"STORAGE_BACKEND invalido: {settings.STORAGE_BACKEND}")
+    return _storage
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+
+try:
+    import aiomysql
+    from aiomysql import DictCursor
+except ImportError:  # only the API needs it; scripts and jobs use the blocking connector
+    aiomysql = None
+    DictCursor = None
+
+
+class AsyncConnectionPool:
+    """aiomysql pool for the route handlers, with the same limits, pre-ping and stats as the blocking
+    ConnectionPool; at most ``size + max_overflow`` connections are open at once.
+
+    A returned connection is rolled back first: aiomysql closes connections released mid-transaction.
+    """
+
+    def __init__(self, pool, timeout: float = None, pre_ping: bool = True):
+        self._pool = pool
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+
+        self._checkouts = 0
+        self._discarded = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @classmethod
+    async def create(cls, size: int, max_overflow: int = 0, timeout: float = None, recycle: float = 0,
+                     pre_ping: bool = True) -> "AsyncConnectionPool":
+        if aiomysql is None:
+            raise RuntimeError("O acesso assincrono ao banco de dados requer o pacote aiomysql")
+
+        pool = await aiomysql.create_pool(
+            host=settings.database_host,
+            user=settings.database_user,
+            password=settings.database_password,
+            db=settings.database_name,
+            port=int(settings.database_port),
+            minsize=size,
+            maxsize=size + max_overflow,
+            pool_recycle=recycle or -1,
+        )
+        return cls(pool, timeout, pre_ping)
+
+    async def acquire(self):
+        started_at = time.perf_counter()
+        # free connections are handed out without waiting; connecting a new one is not a wait
+        waited = self._pool.freesize == 0 and self._pool.size >= self._pool.maxsize
+        try:
+            connection = await asyncio.wait_for(self._pool.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise TimeoutError("Nenhuma conexao com o banco de dados disponivel no momento")
+        wait_time = time.perf_counter() - started_at
+
+        self._checkouts += 1
+        if waited:
+            self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        if self.pre_ping:
+            try:
+                await connection.ping(reconnect=True)
+            except Exception:
+                self._discarded += 1
+                await self._pool.release(connection)
+                raise
+        return connection
+
+    async def release(self, connection):
+        try:
+            await connection.rollback()
+        except Exception:
+            self._discarded += 1
+            connection.close()
+        await self._pool.release(connection)
+
+    @asynccontextmanager
+    async def connection(self):
+        connection = await self.acquire()
+        try:
+            yield connection
+        finally:
+            await self.release(connection)
+
+    async def close(self):
+        self._pool.close()
+        await self._pool.wait_closed()
+
+    def stats(self) -> dict:
+        return {
+            "size": self._pool.minsize,
+            "max_overflow": self._pool.maxsize - self._pool.minsize,
+            "in_use": self._pool.size - self._pool.freesize,
+            "idle": self._pool.freesize,
+            "checkouts": self._checkouts,
+            "discarded": self._discarded,
+            "waits": self._waits,
+            "timeouts": self._timeouts,
+            "wait_time_total": round(self._wait_time_total, 6),
+            "wait_time_avg": round(self._wait_time_total / self._waits, 6) if self._waits else 0.0,
+            "wait_time_max": round(self._wait_time_max, 6),
+        }
+
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await AsyncConnectionPool.create(settings.DB_POOL_SIZE, settings.DB_POOL_MAX_OVERFLOW,
+                                                         settings.DB_POOL_TIMEOUT, settings.DB_POOL_RECYCLE,
+                                                         settings.DB_POOL_PRE_PING)
+    return _pool
+
+
+def get_async_pool_stats():
+    if _pool is None:
+        return None
+    return _pool.stats()
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
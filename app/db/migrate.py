@@ -0,0 +1,124 @@
+"""Applies the numbered SQL files of ``app/db/migrations`` that the database has not run yet.
+
+    python -m app.db.migrate [--list] [--baseline VERSION]
+
+Applied versions are recorded in ``schema_migrations``. A database created by hand before the
+migrations existed is adopted with ``--baseline 1``, which records the versions up to 1 without
+running them; 0002 checks ``information_schema`` first, so it also runs on the databases that got
+``photos.content_hash`` by hand. A database created from the current ``ddl.txt`` already has every
+version and is adopted with ``--baseline`` and the highest version in ``migrations``.
+MySQL commits DDL implicitly, so each file is recorded right after its last statement; a file that
+fails halfway has to be fixed by hand before running the migrations again.
+"""
+import argparse
+import os
+import re
+from typing import List, NamedTuple
+
+import mysql.connector
+
+from app.db.session import get_connection
+from app.db.unit_of_work import UnitOfWork
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+CREATE_SCHEMA_MIGRATIONS_QUERY = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for file_name in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(file_name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, file_name)))
+
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError("Existem migracoes com o mesmo numero de versao.")
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """Statements of a migration file: ``--`` comment lines are dropped and a ``;`` ends a statement."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def applied_versions(connection: mysql.connector.MySQLConnection) -> set:
+    cursor = connection.cursor()
+    cursor.execute(CREATE_SCHEMA_MIGRATIONS_QUERY)
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def record_migration(connection: mysql.connector.MySQLConnection, migration: Migration):
+    with UnitOfWork(connection) as unit_of_work:
+        unit_of_work.add("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (migration.version, migration.name))
+
+
+def migrate(connection: mysql.connector.MySQLConnection, migrations: List[Migration]) -> List[Migration]:
+    applied = applied_versions(connection)
+    pending = [migration for migration in migrations if migration.version not in applied]
+
+    for migration in pending:
+        with open(migration.path, encoding="utf-8") as file:
+            statements = split_statements(file.read())
+        print(f"Aplicando {migration.version:04d}_{migration.name} ({len(statements)} comandos)")
+        cursor = connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+        record_migration(connection, migration)
+    return pending
+
+
+def baseline(connection: mysql.connector.MySQLConnection, migrations: List[Migration], version: int):
+    applied = applied_versions(connection)
+    for migration in migrations:
+        if migration.version <= version and migration.version not in applied:
+            print(f"Marcando {migration.version:04d}_{migration.name} como aplicada")
+            record_migration(connection, migration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica as migracoes pendentes do banco de dados.")
+    parser.add_argument("--list", action="store_true", help="lista as migracoes e se ja foram aplicadas")
+    parser.add_argument("--baseline", type=int, metavar="VERSION",
+                        help="marca as migracoes ate VERSION como aplicadas, sem executa-las")
+    args = parser.parse_args()
+
+    migrations = load_migrations()
+    connection = get_connection()
+    try:
+        if args.list:
+            applied = applied_versions(connection)
+            for migration in migrations:
+                print(f"{'x' if migration.version in applied else ' '} {migration.version:04d}_{migration.name}")
+        elif args.baseline is not None:
+            baseline(connection, migrations, args.baseline)
+        else:
+            pending = migrate(connection, migrations)
+            print(f"{len(pending)} migracoes aplicadas" if pending else "Banco de dados atualizado")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
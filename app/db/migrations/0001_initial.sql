@@ -0,0 +1,61 @@
+CREATE TABLE `users` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(255) DEFAULT NULL,
+  `last_name` varchar(255) DEFAULT NULL,
+  `email` varchar(255) NOT NULL,
+  `password_hash` varchar(255) NOT NULL,
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  `last_login` timestamp NULL DEFAULT NULL,
+  `eyelid_surgery` tinyint(1) NOT NULL DEFAULT '0',
+  `nasolabial_fold` tinyint(1) NOT NULL DEFAULT '0',
+  `nasolabial_fold_only_paralyzed_side` tinyint(1) NOT NULL DEFAULT '0',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `email` (`email`)
+);
+
+CREATE TABLE sessions (
+    session_id int NOT NULL AUTO_INCREMENT,
+    user_id INT NOT NULL,
+    status ENUM('created', 'pending', 'completed', 'processed') NOT NULL DEFAULT 'created',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (`session_id`),
+    CONSTRAINT fk_sessions_users FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE photos (
+    photo_id CHAR(36) PRIMARY KEY,
+    session_id INT NOT NULL,
+    photo_url TEXT NOT NULL,
+    facial_expression TEXT NOT NULL,
+    with_points BOOL NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_photos_sessions FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+);
+
+CREATE TABLE results (
+    result_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    session_id INT NOT NULL,
+    house_brackmann TEXT NOT NULL,
+    sunnybrook TEXT NOT NULL,
+    hb_eyes_simetry INT NOT NULL,
+    hb_mouth_simetry INT NOT NULL,
+    sb_forehead_wrinkle_simetry INT NOT NULL,
+    sb_gentle_eye_closure_simetry INT NOT NULL,
+    sb_smile_simetry INT NOT NULL,
+    sb_snarl_simetry INT NOT NULL,
+    sb_lip_pucker_simetry INT NOT NULL,
+    eyes_synkinesis BOOL NOT NULL,
+    eyebrows_synkinesis BOOL NOT NULL,
+    mouth_synkinesis BOOL NOT NULL,
+    mouth_synkinesis_by_raising_eyebrows BOOL NOT NULL,
+    eyebrows_synkinesis_by_closing_eyes BOOL NOT NULL,
+    mouth_synkinesis_by_closing_eyes BOOL NOT NULL,
+    eyebrows_synkinesis_by_smiling BOOL NOT NULL,
+    eyes_synkinesis_by_smiling BOOL NOT NULL,
+    eyes_synkinesis_by_snarl BOOL NOT NULL,
+    eyebrows_synkinesis_by_lip_pucker BOOL NOT NULL,
+    eyes_synkinesis_by_lip_pucker BOOL NOT NULL,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_results_sessions FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+);
@@ -0,0 +1,21 @@
+-- content hash of the uploaded bytes, so a retried upload reuses the photo already processed.
+-- some databases got the column by hand before this migration existed, so each change is
+-- only made when information_schema does not list it yet (MySQL has no ADD COLUMN IF NOT EXISTS)
+
+SET @add_content_hash = (
+    SELECT IF(COUNT(*) = 0, 'ALTER TABLE photos ADD COLUMN content_hash CHAR(64) NULL AFTER with_points', 'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'photos' AND COLUMN_NAME = 'content_hash'
+);
+PREPARE add_content_hash FROM @add_content_hash;
+EXECUTE add_content_hash;
+DEALLOCATE PREPARE add_content_hash;
+
+SET @add_content_hash_key = (
+    SELECT IF(COUNT(*) = 0, 'ALTER TABLE photos ADD KEY idx_photos_session_content_hash (session_id, content_hash)', 'DO 0')
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'photos' AND INDEX_NAME = 'idx_photos_session_content_hash'
+);
+PREPARE add_content_hash_key FROM @add_content_hash_key;
+EXECUTE add_content_hash_key;
+DEALLOCATE PREPARE add_content_hash_key;
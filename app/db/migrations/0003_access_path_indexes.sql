@@ -0,0 +1,11 @@
+-- named indexes for the hot filters; InnoDB only had the ones implied by the foreign keys.
+-- secondary indexes carry the primary key, so these also cover the photo_id / result_id / session_id reads
+
+-- session images and the history photos: WHERE session_id = ? and with_points = FALSE
+ALTER TABLE photos ADD KEY idx_photos_session_with_points (session_id, with_points);
+
+-- latest result of a session: MAX(result_id) / ORDER BY result_id DESC per session_id
+ALTER TABLE results ADD KEY idx_results_session_result (session_id, result_id);
+
+-- session history: WHERE user_id = ? ORDER BY session_id DESC, keyset on session_id
+ALTER TABLE sessions ADD KEY idx_sessions_user_session (user_id, session_id);
@@ -0,0 +1,2 @@
+-- message of the last failed background processing, readable by every API worker
+ALTER TABLE sessions ADD COLUMN error TEXT NULL AFTER status;
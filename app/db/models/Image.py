@@ -0,0 +1,8 @@
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+class ImageUploadResult(BaseModel):
+    facial_expression: str
+    status: Literal['created', 'duplicate', 'error']
+    photo_id: Optional[str] = None
+    error: Optional[str] = None
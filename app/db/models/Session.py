@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 import datetime
 
@@ -7,6 +7,7 @@ class NewSessionPayload(BaseModel):
 
 class ProcessSessionPayload(BaseModel):
     session_id: int
+    background: bool = False
 
 class SessionResult(BaseModel):
     session_id: int
@@ -31,4 +32,10 @@ class SessionResult(BaseModel):
     eyebrows_synkinesis_by_lip_pucker: bool
     eyes_synkinesis_by_lip_pucker: bool
     processed_at: datetime.datetime
-    photos: List[str]
\ No newline at end of file
+    photos: List[str]
+
+class SessionStatus(BaseModel):
+    session_id: int
+    status: Literal['created', 'pending', 'completed', 'processed']
+    error: Optional[str] = None
+    result: Optional[SessionResult] = None
@@ -1,8 +1,15 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import mysql.connector
 from app.core.config import settings
 
 
 def get_connection():
+    """A new, unpooled connection; for scripts and other long-lived users."""
     connection = mysql.connector.connect(
         host=settings.database_host,
         user=settings.database_user,
@@ -11,3 +18,193 @@ def get_connection():
         port=settings.database_port,
     )
     return connection
+
+
+class ConnectionPool:
+    """Pool of MySQL connections: ``size`` are kept open, up to ``max_overflow`` more are opened under load
+    and closed when returned.
+
+    Idle connections older than ``recycle`` seconds are replaced and, with ``pre_ping``, checked before
+    being handed out. A returned connection is rolled back, so the next user neither inherits an open
+    transaction nor its snapshot.
+    """
+
+    def __init__(self, size: int, max_overflow: int = 0, timeout: float = None, recycle: float = 0,
+                 pre_ping: bool = True, connect=get_connection):
+        if size < 1:
+            raise ValueError("O pool de conexoes deve ter pelo menos 1 conexao.")
+
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._connect = connect
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        # (connection, created_at), most recently returned last
+        self._idle = deque()
+        self._created_at = {}
+        self._in_use = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._connects = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _open(self):
+        connection = self._connect()
+        with self._lock:
+            self._connects += 1
+            self._created_at[id(connection)] = time.monotonic()
+        return connection
+
+    def _close(self, connection):
+        with self._lock:
+            self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, connection, created_at: float) -> bool:
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._lock:
+                self._recycled += 1
+            return False
+        if self.pre_ping:
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                with self._lock:
+                    self._discarded += 1
+                return False
+        return True
+
+    def acquire(self):
+        started_at = time.perf_counter()
+        waited = False
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("O pool de conexoes foi encerrado.")
+            while not self._idle and self._in_use >= self.size + self.max_overflow:
+                waited = True
+                remaining = None if self.timeout is None else self.timeout - (time.perf_counter() - started_at)
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise TimeoutError("Nenhuma conexao com o banco de dados disponivel no momento")
+                self._available.wait(remaining)
+            # reserves the slot before connecting, so the pool never opens more than its limit
+            self._in_use += 1
+            idle = self._idle.pop() if self._idle else None
+
+            wait_time = time.perf_counter() - started_at
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        try:
+            if idle is not None:
+                connection, created_at = idle
+                if self._is_usable(connection, created_at):
+                    return connection
+                self._close(connection)
+            return self._open()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._available.notify()
+            raise
+
+    def release(self, connection):
+        try:
+            connection.rollback()
+            usable = True
+        except Exception:
+            usable = False
+
+        with self._lock:
+            self._in_use -= 1
+            created_at = self._created_at.get(id(connection))
+            keep = usable and not self._closed and created_at is not None and len(self._idle) < self.size
+            if keep:
+                self._idle.append((connection, created_at))
+            elif not usable:
+                self._discarded += 1
+            self._available.notify()
+        if not keep:
+            self._close(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._available.notify_all()
+        for connection, _ in idle:
+            self._close(connection)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "connects": self._connects,
+                "recycled": self._recycled,
+                "discarded": self._discarded,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_avg": round(self._wait_time_total / self._waits, 6) if self._waits else 0.0,
+                "wait_time_max": round(self._wait_time_max, 6),
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    # connections must not cross a fork, so each worker process builds its own pool
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(settings.DB_POOL_SIZE, settings.DB_POOL_MAX_OVERFLOW,
+                                       settings.DB_POOL_TIMEOUT, settings.DB_POOL_RECYCLE,
+                                       settings.DB_POOL_PRE_PING)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def get_pool_stats():
+    if _pool is None or _pool_pid != os.getpid():
+        return None
+    return _pool.stats()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
@@ -0,0 +1,78 @@
+from typing import Dict, Iterable, List
+
+
+class UnitOfWork:
+    """Collects the writes of one operation and runs them in a single transaction, committed once.
+
+    Rows queued for the same statement are sent together with ``executemany``, which the connector
+    turns into one multi-row INSERT. Statements run in the order they were first queued, so a row
+    must be queued before the rows that reference it.
+
+        with UnitOfWork(connection) as unit_of_work:
+            unit_of_work.add(INSERT_RESULT_QUERY, values)
+            unit_of_work.add(SET_SESSION_STATUS_QUERY, ('processed', session_id))
+
+    Nothing is written when the block raises; a failed commit is rolled back and re-raised.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._writes: Dict[str, List[tuple]] = {}
+
+    def add(self, query: str, params: tuple):
+        self._writes.setdefault(query, []).append(params)
+
+    def add_many(self, query: str, rows: Iterable[tuple]):
+        self._writes.setdefault(query, []).extend(rows)
+
+    def commit(self):
+        writes, self._writes = self._writes, {}
+        cursor = self.connection.cursor()
+        try:
+            for query, rows in writes.items():
+                if len(rows) == 1:
+                    cursor.execute(query, rows[0])
+                elif rows:
+                    cursor.executemany(query, rows)
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self._writes = {}
+
+
+class AsyncUnitOfWork(UnitOfWork):
+    """UnitOfWork on an aiomysql connection, used with ``async with``."""
+
+    async def commit(self):
+        writes, self._writes = self._writes, {}
+        try:
+            async with self.connection.cursor() as cursor:
+                for query, rows in writes.items():
+                    if len(rows) == 1:
+                        await cursor.execute(query, rows[0])
+                    elif rows:
+                        await cursor.executemany(query, rows)
+            await self.connection.commit()
+        except Exception as e:
+            await self.connection.rollback()
+            raise e
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.commit()
+        else:
+            self._writes = {}
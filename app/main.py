@@ -1,8 +1,27 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api import sessions, auth, images
+from app.core.executor import get_executor_stats, shutdown_executor
+from app.db.async_session import close_async_pool, get_async_pool_stats
+from app.db.session import close_pool, get_pool_stats
+from app.services.face_landmarker_pool import get_face_landmarker_pool_stats
+from app.services.jobs import get_session_job_queue_stats, shutdown_session_job_queue
+from app.services.overlay_cache import get_overlay_cache_stats
+from app.services.result_cache import get_result_cache_stats
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    shutdown_session_job_queue()
+    shutdown_executor()
+    close_pool()
+    await close_async_pool()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
@@ -11,3 +30,15 @@ app.include_router(images.router, prefix="/images", tags=["sessions"])
 @app.get("/health-check")
 def health_check():
     return {"status": "alive"}
+
+@app.get("/stats")
+def stats():
+    return {
+        "db_pool": get_pool_stats(),
+        "db_async_pool": get_async_pool_stats(),
+        "face_landmarker_pool": get_face_landmarker_pool_stats(),
+        "executor": get_executor_stats(),
+        "session_jobs": get_session_job_queue_stats(),
+        "overlay_cache": get_overlay_cache_stats(),
+        "session_result_cache": get_result_cache_stats(),
+    }
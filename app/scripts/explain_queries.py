@@ -0,0 +1,72 @@
+"""Runs EXPLAIN on the queries of the services and fails when one of them scans a whole table.
+
+    python -m app.scripts.explain_queries [--migrate]
+
+Meant for a local MySQL stand-in (the ``database_*`` settings): ``--migrate`` first applies the
+pending migrations, so an empty database gets the same schema and indexes as production.
+"""
+import argparse
+import sys
+from typing import List, Tuple
+
+from app.db import migrate
+from app.db.session import get_connection
+from app.services import auth_service, images_service, sessions_service
+
+PHOTO_ID = "00000000-0000-0000-0000-000000000000"
+CONTENT_HASH = "0" * 64
+
+# (name, query, parameters); the whole-table listing of the test endpoint /auth/users is left out on purpose
+QUERIES: List[Tuple[str, str, tuple]] = [
+    ("auth.get_user_by_email", auth_service.GET_USER_BY_EMAIL_QUERY, ("user@example.com",)),
+    ("auth.get_user_by_id", auth_service.GET_USER_BY_ID_QUERY, (1,)),
+    ("sessions.get_sessions (ids)", *sessions_service.session_ids_query(1, None, 20)),
+    ("sessions.get_sessions (ids, next page)", *sessions_service.session_ids_query(1, 100, 20)),
+    ("sessions.get_sessions (results)", *sessions_service.sessions_query([1, 2, 3])),
+    ("sessions.get_sessions (photos)", *sessions_service.sessions_photos_query([1, 2, 3])),
+    ("sessions.get_session_images", sessions_service.GET_SESSION_IMAGES_QUERY, (1,)),
+    ("sessions.get_session", sessions_service.GET_SESSION_QUERY, (1, 1)),
+    ("sessions.set_session_status", sessions_service.SET_SESSION_STATUS_QUERY, ("pending", 1)),
+    ("sessions.set_session_status (error)", sessions_service.SET_SESSION_ERROR_QUERY, ("completed", "erro", 1)),
+    ("sessions.get_session_result", sessions_service.GET_SESSION_RESULT_QUERY, (1,)),
+    ("images.user_owns_image", images_service.USER_OWNS_IMAGE_QUERY, (PHOTO_ID, 1)),
+    ("images.find_uploaded_image", images_service.FIND_UPLOADED_IMAGE_QUERY, (1, CONTENT_HASH, "rest")),
+]
+
+
+def explain(connection, query: str, params: tuple) -> List[dict]:
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f"EXPLAIN {query.strip().rstrip(';')}", params)
+    plan = cursor.fetchall()
+    cursor.close()
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica com EXPLAIN que nenhuma consulta dos servicos le a tabela inteira.")
+    parser.add_argument("--migrate", action="store_true", help="aplica as migracoes pendentes antes")
+    args = parser.parse_args()
+
+    connection = get_connection()
+    full_scans = []
+    try:
+        if args.migrate:
+            migrate.migrate(connection, migrate.load_migrations())
+
+        for name, query, params in QUERIES:
+            for row in explain(connection, query, params):
+                print(f"{name:40} {row.get('table') or '-':12} {row.get('type') or '-':8} "
+                      f"{row.get('key') or '-':36} {row.get('Extra') or ''}")
+                if row.get('type') == 'ALL':
+                    full_scans.append(f"{name} ({row.get('table')})")
+    finally:
+        connection.close()
+
+    if full_scans:
+        print(f"Leitura completa de tabela em: {', '.join(full_scans)}")
+        sys.exit(1)
+    print(f"{len(QUERIES)} consultas sem leitura completa de tabela")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Recomputes the HB and SB scores of every processed session with the current scoring rules.
+
+    python -m app.scripts.rescore [--chunk-size 200] [--workers 4] [--dry-run]
+
+Sessions are read from MySQL in keyset-paginated chunks, scored on a process pool from the stored
+per-photo features, and the latest ``results`` row of each session is updated in one batch per chunk.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import mysql.connector
+
+from app.db.session import get_connection
+from app.db.unit_of_work import UnitOfWork
+from app.services.geometry import FaceGeometry
+from app.services.result_cache import get_result_cache
+from app.services.sessions_service import SessionService, load_photo_features
+
+SCORE_COLUMNS = [
+    'house_brackmann', 'sunnybrook', 'hb_eyes_simetry', 'hb_mouth_simetry', 'sb_forehead_wrinkle_simetry',
+    'sb_gentle_eye_closure_simetry', 'sb_smile_simetry', 'sb_snarl_simetry', 'sb_lip_pucker_simetry',
+    'eyes_synkinesis', 'eyebrows_synkinesis', 'mouth_synkinesis', 'mouth_synkinesis_by_raising_eyebrows',
+    'eyebrows_synkinesis_by_closing_eyes', 'mouth_synkinesis_by_closing_eyes', 'eyebrows_synkinesis_by_smiling',
+    'eyes_synkinesis_by_smiling', 'eyes_synkinesis_by_snarl', 'eyebrows_synkinesis_by_lip_pucker',
+    'eyes_synkinesis_by_lip_pucker',
+]
+
+# processed_at is kept: it records when the session was processed, not when it was last scored
+UPDATE_RESULT_QUERY = f"""
+    UPDATE results
+    SET {', '.join(f'{column} = %s' for column in SCORE_COLUMNS)}
+    WHERE result_id = %s
+"""
+
+
+def fetch_sessions_chunk(connection: mysql.connector.MySQLConnection, after_result_id: int, chunk_size: int) -> List[Dict]:
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT r.result_id, r.session_id, s.user_id, u.eyelid_surgery, u.nasolabial_fold, u.nasolabial_fold_only_paralyzed_side
+        FROM results as r
+            join sessions as s
+                on s.session_id = r.session_id
+            join users as u
+                on u.id = s.user_id
+        WHERE r.result_id > %s
+            and r.result_id = (SELECT MAX(latest.result_id) FROM results as latest WHERE latest.session_id = r.session_id)
+        ORDER BY r.result_id
+        LIMIT %s
+    """, (after_result_id, chunk_size))
+    sessions = cursor.fetchall()
+    cursor.close()
+    if not sessions:
+        return sessions
+
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT session_id, photo_id, facial_expression
+        FROM photos
+        WHERE with_points = FALSE and session_id IN ({', '.join(['%s'] * len(sessions))})
+    """, tuple(session['session_id'] for session in sessions))
+    photos = defaultdict(list)
+    for photo in cursor.fetchall():
+        photos[photo['session_id']].append(photo)
+    cursor.close()
+
+    for session in sessions:
+        session['images'] = photos[session['session_id']]
+    return sessions
+
+
+def score_session(session: Dict) -> Dict:
+    """Process pool task: scores one session and returns its result columns, or the error."""
+    try:
+        features = {
+            image['facial_expression']: load_photo_features(image['photo_id'])
+            for image in session['images']
+        }
+        scores = SessionService(None).score_session(FaceGeometry.from_features(features), session)
+        return {'result_id': session['result_id'], 'session_id': session['session_id'], 'user_id': session['user_id'], 'scores': scores}
+    except Exception as e:
+        return {'result_id': session['result_id'], 'session_id': session['session_id'], 'user_id': session['user_id'], 'error': str(e)}
+
+
+def save_scores(connection: mysql.connector.MySQLConnection, scored: List[Dict]):
+    with UnitOfWork(connection) as unit_of_work:
+        unit_of_work.add_many(UPDATE_RESULT_QUERY, [
+            tuple(item['scores'][column] for column in SCORE_COLUMNS) + (item['result_id'],) for item in scored
+        ])
+    # only reaches the API workers with a shared (redis) result cache
+    cache = get_result_cache()
+    for item in scored:
+        cache.invalidate(item['session_id'], item['user_id'])
+
+
+def rescore(chunk_size: int, workers: int, dry_run: bool):
+    connection = get_connection()
+    started_at = time.perf_counter()
+    total = failed = 0
+    after_result_id = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            while True:
+                chunk_started_at = time.perf_counter()
+                sessions = fetch_sessions_chunk(connection, after_result_id, chunk_size)
+                if not sessions:
+                    break
+                after_result_id = sessions[-1]['result_id']
+
+                results = list(executor.map(score_session, sessions))
+                scored = [item for item in results if 'scores' in item]
+                for item in results:
+                    if 'error' in item:
+                        print(f"Sessao {item['session_id']}: {item['error']}")
+
+                if scored and not dry_run:
+                    save_scores(connection, scored)
+
+                total += len(sessions)
+                failed += len(sessions) - len(scored)
+                chunk_time = time.perf_counter() - chunk_started_at
+                print(f"{total} sessoes ({failed} com erro) - chunk de {len(sessions)} em {chunk_time:.2f}s "
+                      f"({len(sessions) / chunk_time:.1f} sessoes/s)")
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - started_at
+    print(f"Total: {total} sessoes, {failed} com erro, {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:.1f} sessoes/s){' [dry-run]' if dry_run else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula as classificacoes HB e SB das sessoes processadas.")
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--dry-run", action="store_true", help="calcula sem gravar no banco")
+    args = parser.parse_args()
+
+    rescore(args.chunk_size, args.workers, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
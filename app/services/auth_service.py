@@ -1,88 +1,96 @@
 import bcrypt
-import mysql
 
+from app.core.executor import run_blocking
+from app.db.async_session import DictCursor
 from app.db.models import User
 from app.db.models.User import UserEdit
 
+GET_USERS_QUERY = "SELECT * FROM users"
 
-class AuthService:
-    def __init__(self, db_connection: mysql.connector.MySQLConnection):
+GET_USER_BY_EMAIL_QUERY = "SELECT id, name, last_name, email, password_hash, eyelid_surgery, nasolabial_fold, nasolabial_fold_only_paralyzed_side FROM users WHERE users.email = %s"
+
+GET_USER_BY_ID_QUERY = "SELECT id, name, last_name, email, password_hash, eyelid_surgery, nasolabial_fold, nasolabial_fold_only_paralyzed_side FROM users WHERE users.id = %s"
+
+CREATE_USER_QUERY = """
+    INSERT INTO users (name, last_name, email, password_hash, eyelid_surgery, nasolabial_fold, nasolabial_fold_only_paralyzed_side)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+EDIT_USER_QUERY = """
+    UPDATE users
+    SET
+        name = %s,
+        last_name = %s,
+        email = %s,
+        password_hash = %s,
+        eyelid_surgery = %s,
+        nasolabial_fold = %s,
+        nasolabial_fold_only_paralyzed_side = %s
+    WHERE id = %s
+"""
+
+
+def _hash_password(password: str) -> bytes:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+
+
+def _create_user_values(user: User, password_hash: bytes):
+    return (user.name, user.last_name, user.email, password_hash, user.eyelid_surgery, user.nasolabial_fold, user.nasolabial_fold_only_paralyzed_side)
+
+
+def _edit_user_values(user: UserEdit, password_hash: bytes):
+    return (
+        user.name,
+        user.last_name,
+        user.email,
+        password_hash,
+        user.eyelid_surgery,
+        user.nasolabial_fold,
+        user.nasolabial_fold_only_paralyzed_side,
+        user.id,
+    )
+
+
+class AsyncAuthService:
+    """User queries for the route handlers, on an aiomysql connection."""
+
+    def __init__(self, db_connection):
         self.connection = db_connection
 
-    def get_users(self):
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users")
-        result = cursor.fetchall()
-        cursor.close()
-        return result
-
-    def get_user_by_email(self, email: str):
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("SELECT id, name, last_name, email, password_hash, eyelid_surgery, nasolabial_fold, nasolabial_fold_only_paralyzed_side FROM users WHERE users.email = %s", (email,))
-        result = cursor.fetchone()
-        cursor.close()
-        return result
-
-    def get_user_by_id(self, user_id: int):
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("SELECT id, name, last_name, email, password_hash, eyelid_surgery, nasolabial_fold, nasolabial_fold_only_paralyzed_side FROM users WHERE users.id = %s", (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
-        return result
-
-    def create_user(self, user: User):
-        password_hash = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt())
-        cursor = self.connection.cursor()
+    async def get_users(self):
+        async with self.connection.cursor(DictCursor) as cursor:
+            await cursor.execute(GET_USERS_QUERY)
+            return await cursor.fetchall()
 
+    async def get_user_by_email(self, email: str):
+        async with self.connection.cursor(DictCursor) as cursor:
+            await cursor.execute(GET_USER_BY_EMAIL_QUERY, (email,))
+            return await cursor.fetchone()
+
+    async def get_user_by_id(self, user_id: int):
+        async with self.connection.cursor(DictCursor) as cursor:
+            await cursor.execute(GET_USER_BY_ID_QUERY, (user_id,))
+            return await cursor.fetchone()
+
+    async def create_user(self, user: User):
+        # bcrypt is deliberately slow, so it runs off the event loop
+        password_hash = await run_blocking(_hash_password, user.password)
         try:
-            cursor.execute(
-                """
-                INSERT INTO users (name, last_name, email, password_hash, eyelid_surgery, nasolabial_fold, nasolabial_fold_only_paralyzed_side)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """,
-                (user.name, user.last_name, user.email, password_hash, user.eyelid_surgery, user.nasolabial_fold, user.nasolabial_fold_only_paralyzed_side)
-            )
-            self.connection.commit()
-            return cursor.lastrowid
+            async with self.connection.cursor() as cursor:
+                await cursor.execute(CREATE_USER_QUERY, _create_user_values(user, password_hash))
+                await self.connection.commit()
+                return cursor.lastrowid
         except Exception as e:
-            self.connection.rollback()
+            await self.connection.rollback()
             raise e
-        finally:
-            cursor.close()
-
-    def edit_user(self, user: UserEdit):
-        password_hash = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt())
-        cursor = self.connection.cursor()
 
+    async def edit_user(self, user: UserEdit):
+        password_hash = await run_blocking(_hash_password, user.password)
         try:
-            cursor.execute(
-                """
-                UPDATE users
-                SET 
-                    name = %s,
-                    last_name = %s,
-                    email = %s,
-                    password_hash = %s,
-                    eyelid_surgery = %s,
-                    nasolabial_fold = %s,
-                    nasolabial_fold_only_paralyzed_side = %s
-                WHERE id = %s
-                """,
-                (
-                    user.name,
-                    user.last_name,
-                    user.email,
-                    password_hash,
-                    user.eyelid_surgery,
-                    user.nasolabial_fold,
-                    user.nasolabial_fold_only_paralyzed_side,
-                    user.id,
-                )
-            )
-            self.connection.commit()
-            return user.id
+            async with self.connection.cursor() as cursor:
+                await cursor.execute(EDIT_USER_QUERY, _edit_user_values(user, password_hash))
+                await self.connection.commit()
+                return user.id
         except Exception as e:
-            self.connection.rollback()
+            await self.connection.rollback()
             raise e
-        finally:
-            cursor.close()
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from mediapipe.tasks import python
+from mediapipe.tasks.python import vision
+
+from app.core.config import settings
+
+
+class FaceLandmarkerPool:
+    """Fixed-size pool of FaceLandmarker instances; a detector is used by one thread at a time."""
+
+    def __init__(self, size: int, model_path: str, timeout: float = None):
+        if size < 1:
+            raise ValueError("O pool de detectores deve ter pelo menos 1 detector.")
+
+        with open(model_path, "rb") as model_file:
+            model_buffer = model_file.read()
+
+        self.size = size
+        self.timeout = timeout
+        self._detectors = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._detectors.put(self._create_detector(model_buffer))
+
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @staticmethod
+    def _create_detector(model_buffer: bytes):
+        base_options = python.BaseOptions(model_asset_buffer=model_buffer)
+        options = vision.FaceLandmarkerOptions(base_options=base_options,
+                                               output_face_blendshapes=True,
+                                               output_facial_transformation_matrixes=True,
+                                               num_faces=1)
+        return vision.FaceLandmarker.create_from_options(options)
+
+    @contextmanager
+    def checkout(self):
+        started_at = time.perf_counter()
+        waited = False
+        try:
+            detector = self._detectors.get_nowait()
+        except queue.Empty:
+            waited = True
+            try:
+                detector = self._detectors.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError("Nenhum detector facial disponivel no momento")
+        wait_time = time.perf_counter() - started_at
+
+        with self._lock:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        try:
+            yield detector
+        finally:
+            self._detectors.put(detector)
+
+    def stats(self) -> dict:
+        with self._lock:
+            available = self._detectors.qsize()
+            return {
+                "size": self.size,
+                "available": available,
+                "in_use": self.size - available,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_avg": round(self._wait_time_total / self._waits, 6) if self._waits else 0.0,
+                "wait_time_max": round(self._wait_time_max, 6),
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_face_landmarker_pool() -> FaceLandmarkerPool:
+    # the pool is created lazily once per worker process; a forked worker builds its own
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = FaceLandmarkerPool(settings.FACE_LANDMARKER_POOL_SIZE,
+                                           settings.FACE_LANDMARKER_MODEL_PATH,
+                                           settings.FACE_LANDMARKER_POOL_TIMEOUT)
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def get_face_landmarker_pool_stats():
+    if _pool is None or _pool_pid != os.getpid():
+        return None
+    return _pool.stats()
@@ -0,0 +1,119 @@
+import io
+from typing import Dict, List
+
+import numpy as np
+
+from app.services.landmarks import ExpressionLandmarks
+
+MID_FOREHEAD_PT = 10
+AVERAGE_LINE_PT = 168
+MID_MOUTH_END_PT = 13
+# every pair or group below is ordered (left side, right side)
+EYEBROW_PTS = np.array([[300, 293, 334, 296, 336, 276, 283, 282, 295, 285],
+                        [70, 63, 105, 66, 107, 46, 53, 52, 65, 55]])
+EYEBROW_MID_PTS = EYEBROW_PTS[:, :5]
+EYE_OPEN_PTS = np.array([[386, 374], [159, 145]])
+MOUTH_END_PTS = np.array([291, 61])
+ALAR_BASE_PTS = np.array([278, 48])
+LIP_PUCKER_PTS = np.array([[288, 291], [58, 61]])
+
+FEATURE_NAMES = [
+    'eyebrow_highest_x',
+    'eyebrow_lowest_x',
+    'eyebrow_mid_to_forehead_horizontal',
+    'eye_open',
+    'eye_open_horizontal',
+    'mouth_end_to_mid_vertical',
+    'mouth_end_to_average_line',
+    'mouth_end_y',
+    'alar_base_y',
+    'lip_pucker_width',
+]
+
+
+def px_coordinates(landmarks: List[ExpressionLandmarks]) -> np.ndarray:
+    """Stacks the landmarks of several photos into a (N, 478, 2) array of integer pixel coordinates."""
+    points = np.stack([item.points[:, :2] for item in landmarks])
+    limits = np.array([[item.width - 1, item.height - 1] for item in landmarks], dtype=np.float64)
+    return np.clip(np.floor(points), 0, limits[:, None, :])
+
+
+def _euclidean(deltas: np.ndarray) -> np.ndarray:
+    return np.sqrt(deltas[..., 0] ** 2 + deltas[..., 1] ** 2)
+
+
+def compute_features(px: np.ndarray) -> Dict[str, np.ndarray]:
+    """Computes every distance, midpoint and extreme the scores use for a (N, 478, 2) batch of photos.
+
+    Each feature has shape (N, 2) with the left side first and the right side second.
+    """
+    eyebrows_x = px[:, EYEBROW_PTS, 0]
+    eyebrow_mid_x = np.floor(px[:, EYEBROW_MID_PTS, 0].sum(axis=2) / EYEBROW_MID_PTS.shape[1])
+    eye_open_deltas = px[:, EYE_OPEN_PTS[:, 0]] - px[:, EYE_OPEN_PTS[:, 1]]
+    mouth_end = px[:, MOUTH_END_PTS]
+    lip_pucker_deltas = px[:, LIP_PUCKER_PTS[:, 0]] - px[:, LIP_PUCKER_PTS[:, 1]]
+
+    return {
+        'eyebrow_highest_x': eyebrows_x.min(axis=2),
+        'eyebrow_lowest_x': eyebrows_x.max(axis=2),
+        'eyebrow_mid_to_forehead_horizontal': np.abs(eyebrow_mid_x - px[:, [MID_FOREHEAD_PT], 0]),
+        'eye_open': _euclidean(eye_open_deltas),
+        'eye_open_horizontal': np.abs(eye_open_deltas[..., 0]),
+        'mouth_end_to_mid_vertical': np.abs(mouth_end[..., 1] - px[:, [MID_MOUTH_END_PT], 1]),
+        'mouth_end_to_average_line': _euclidean(mouth_end - px[:, [AVERAGE_LINE_PT]]),
+        'mouth_end_y': mouth_end[..., 1],
+        'alar_base_y': px[:, ALAR_BASE_PTS, 1],
+        'lip_pucker_width': _euclidean(lip_pucker_deltas),
+    }
+
+
+def photo_features(landmarks: ExpressionLandmarks) -> Dict[str, np.ndarray]:
+    """Features of a single photo, each a [left, right] array; computed at upload and combined at processing."""
+    return {name: values[0] for name, values in compute_features(px_coordinates([landmarks])).items()}
+
+
+def features_to_bytes(features: Dict[str, np.ndarray]) -> bytes:
+    buffer = io.BytesIO()
+    np.savez(buffer, **features)
+    return buffer.getvalue()
+
+
+def features_from_bytes(content: bytes) -> Dict[str, np.ndarray]:
+    with np.load(io.BytesIO(content)) as data:
+        return {name: data[name] for name in FEATURE_NAMES}
+
+
+class FaceGeometry:
+    """Geometric features of every expression photographed in a session."""
+
+    def __init__(self, expressions: List[str], features: Dict[str, np.ndarray]):
+        self._index = {expression: idx for idx, expression in enumerate(expressions)}
+        self.features = features
+
+    @classmethod
+    def from_landmarks(cls, landmarks_by_expression: Dict[str, ExpressionLandmarks]) -> "FaceGeometry":
+        expressions = list(landmarks_by_expression.keys())
+        px = px_coordinates([landmarks_by_expression[expression] for expression in expressions])
+        return cls(expressions, compute_features(px))
+
+    @classmethod
+    def from_features(cls, features_by_expression: Dict[str, Dict[str, np.ndarray]]) -> "FaceGeometry":
+        expressions = list(features_by_expression.keys())
+        features = {
+            name: np.stack([features_by_expression[expression][name] for expression in expressions])
+            for name in FEATURE_NAMES
+        }
+        return cls(expressions, features)
+
+    def _row(self, expression: str) -> int:
+        if expression not in self._index:
+            raise ValueError(f"Foto da expressão '{expression}' não encontrada.")
+        return self._index[expression]
+
+    def get(self, name: str, expression: str) -> List[float]:
+        """[left, right] values of a feature for one expression."""
+        return self.features[name][self._row(expression)].tolist()
+
+    def variation(self, name: str, expression1: str, expression2: str) -> List[float]:
+        """[left, right] absolute change of a feature between two expressions."""
+        return np.abs(self.features[name][self._row(expression1)] - self.features[name][self._row(expression2)]).tolist()
@@ -1,33 +1,120 @@
-import base64
 import io
-import os
-import shutil
 import cv2
 import mediapipe as mp
-import mysql
+import mysql.connector
 import math
-from fastapi import UploadFile, File
-from mediapipe.tasks import python
-from mediapipe.tasks.python import vision
-from mediapipe import solutions
-from mediapipe.framework.formats import landmark_pb2
 from typing import Tuple, Union, List, Dict
 import numpy as np
 import uuid
 from PIL import Image
 
+from app.core.config import settings
+from app.core.storage import get_storage
+from app.db.async_session import DictCursor
+from app.db.unit_of_work import AsyncUnitOfWork, UnitOfWork
+from app.services.face_landmarker_pool import get_face_landmarker_pool
+from app.services.geometry import features_to_bytes, photo_features
+from app.services.previews import encode_preview, ensure_preview, preview_key
+from app.services.landmarks import ExpressionLandmarks, apply_transform, rotation_transform, rotate_90_transform, \
+    rotated_size, scale_transform, translation_transform
 
-def get_face_landmarks_detection(file_path):
-    base_options = python.BaseOptions(model_asset_path='./face_landmarker_v2_with_blendshapes.task')
-    options = vision.FaceLandmarkerOptions(base_options=base_options,
-                                           output_face_blendshapes=True,
-                                           output_facial_transformation_matrixes=True,
-                                           num_faces=1)
-    detector = vision.FaceLandmarker.create_from_options(options)
+USER_OWNS_IMAGE_QUERY = """
+    SELECT 1
+    FROM photos as p
+        join sessions as s
+            on s.session_id = p.session_id
+    WHERE p.photo_id = %s and s.user_id = %s
+"""
 
-    image = mp.Image.create_from_file(file_path)
+FIND_UPLOADED_IMAGE_QUERY = """
+    SELECT photo_id
+    FROM photos
+    WHERE session_id = %s and content_hash = %s and facial_expression = %s and with_points = FALSE
+    LIMIT 1
+"""
 
-    return detector.detect(image)
+INSERT_IMAGE_QUERY = """
+    INSERT INTO photos (photo_id, session_id, photo_url, facial_expression, with_points, content_hash)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def classify_upload(image_bytes: bytes) -> dict:
+    # entry point for the execution layer: a plain function of picklable arguments
+    return ImagesService(None).classify_image(image_bytes)
+
+
+def _residual_rotation(angle: float) -> float:
+    """``angle`` without its multiples of 90 degrees, in [-45, 45): an upright photo leveled by
+    the eyes and transposed turns by about 180 degrees but only a fraction of a degree in plane."""
+    return (angle + 45) % 90 - 45
+
+
+def get_image_key(photo_id: str, variant: str):
+    if variant == 'preview':
+        return ensure_preview(photo_id)
+
+    key = f"{photo_id}.jpg"
+    return key if get_storage().exists(key) else None
+
+
+_REDUCED_DECODE_FLAGS = [(8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)]
+
+
+def decode_image(image_bytes: bytes, max_side: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Decodes an upload into an RGB array whose longest side is at most ``max_side`` (0 keeps it as is).
+
+    Returns the image and the scale transform from the upload's pixel coordinates onto it. Large JPEGs
+    are decoded directly at the smallest of 1/2, 1/4 or 1/8 size that still covers ``max_side``, so the
+    bitmap allocated is under twice ``max_side`` unless the upload is over 8 times larger.
+    EXIF orientation is ignored, as in the rest of the pipeline.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            width, height = img.size
+    except Exception:
+        raise ValueError("Imagem invalida")
+
+    flags = cv2.IMREAD_COLOR
+    if max_side:
+        for factor, reduced_flag in _REDUCED_DECODE_FLAGS:
+            if max(width, height) // factor >= max_side:
+                flags = reduced_flag
+                break
+
+    image_bgr = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image_bgr is None:
+        raise ValueError("Imagem invalida")
+
+    if max_side and max(image_bgr.shape[:2]) > max_side:
+        ratio = max_side / max(image_bgr.shape[:2])
+        size = (max(1, round(image_bgr.shape[1] * ratio)), max(1, round(image_bgr.shape[0] * ratio)))
+        image_bgr = cv2.resize(image_bgr, size, interpolation=cv2.INTER_AREA)
+
+    scale = scale_transform(image_bgr.shape[1] / width, image_bgr.shape[0] / height)
+    return cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB), scale
+
+
+def warp_image(image_rgb: np.ndarray, transform: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Applies a 3x3 affine transform in pixel-edge coordinates (the landmarks' convention) to an image.
+
+    Areas outside the source are black, as with PIL's rotate and crop.
+    """
+    # cv2 samples at pixel centers: shift into edge coordinates, transform, shift back
+    matrix = translation_transform(-0.5, -0.5) @ transform @ translation_transform(0.5, 0.5)
+    return cv2.warpAffine(image_rgb, matrix[:2], (width, height), flags=cv2.INTER_CUBIC,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0))
+
+
+def detect_face_landmarks(image: mp.Image):
+    with get_face_landmarker_pool().checkout() as detector:
+        return detector.detect(image)
+
+
+def get_face_landmarks_detection(key: str):
+    image_rgb, _ = decode_image(get_storage().read(key))
+
+    return detect_face_landmarks(mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb))
 
 def _normalized_to_pixel_coordinates(normalized_x: float, normalized_y: float, image_width: int,
                                      image_height: int) -> Union[None, Tuple[int, int]]:
@@ -68,90 +155,128 @@ class ImagesService:
                                 109]
         self.external_eye_pts = [263, 33]
 
-    def classify_image(self, file: UploadFile = File(...)):
+    def classify_image(self, image_bytes: bytes):
         image_uuid = str(uuid.uuid4())
-        image_with_points_uuid = str(uuid.uuid4())
         # image_uuid = '$1aaa'
         # image_with_points_uuid = '1bbb'
 
-        current_directory = os.getcwd()
-        file_path = os.path.join(current_directory, f"app/assets/{image_uuid}.jpg")
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        self._pre_process_image(file_path)
-
-        detection_result = get_face_landmarks_detection(file_path)
-
-        image = mp.Image.create_from_file(file_path)
-        annotated_image = self._draw_landmarks_on_image(image.numpy_view(), detection_result)
-        image_bgr = cv2.cvtColor(annotated_image, cv2.COLOR_RGB2BGR)
-
+        storage = get_storage()
+
+        # detection runs on a copy bounded by MAX_WORKING_RESOLUTION, the stored crop is cut from one
+        # bounded by MAX_STORED_RESOLUTION
+        working_rgb, working_scale = decode_image(image_bytes, settings.MAX_WORKING_RESOLUTION)
+        working_side = max(working_rgb.shape[:2])
+        upload_side = max(working_rgb.shape[1] / working_scale[0][0], working_rgb.shape[0] / working_scale[1][1])
+        working_crop_rgb, landmarks, rotation = self._pre_process_image(working_rgb, working_scale)
+        del working_rgb
+
+        image_rgb = working_crop_rgb
+        if round(min(upload_side, settings.MAX_STORED_RESOLUTION or upload_side)) != working_side:
+            image_rgb, landmarks = self._stored_crop(image_bytes, landmarks, working_scale)
+
+        # a large in-plane correction means the first detection saw the face far from its final pose
+        if abs(rotation) > settings.LANDMARKS_MAX_CARRIED_ROTATION:
+            image = mp.Image(image_format=mp.ImageFormat.SRGB, data=working_crop_rgb)
+            detection_result = detect_face_landmarks(image)
+            if len(detection_result.face_landmarks):
+                landmarks = ExpressionLandmarks.from_detection_result(detection_result, landmarks.width,
+                                                                      landmarks.height, landmarks.source_transform)
+
+        image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
         _, encoded_image = cv2.imencode('.jpg', image_bgr)
+        storage.write(f"{image_uuid}.jpg", encoded_image.tobytes())
+        storage.write(preview_key(image_uuid), encode_preview(image_bgr))
+        storage.write(f"{image_uuid}.npz", landmarks.to_bytes())
+        storage.write(f"{image_uuid}.features.npz", features_to_bytes(photo_features(landmarks)))
 
-        # image_base64 = "data:image/jpeg;base64," + base64.b64encode(encoded_image).decode('utf-8')
-        file_path_with_points = os.path.join(current_directory, f"app/assets/${image_with_points_uuid}.jpg")
-
-        encoded_image_buffer = io.BytesIO(encoded_image.tobytes())
-        with open(file_path_with_points, "wb") as buffer:
-            shutil.copyfileobj(encoded_image_buffer, buffer)
-        # original_image_base64 = "data:image/jpeg;base64," + base64.b64encode(image).decode('utf-8')
-        # image_base64 = "data:image/jpeg;base64," + base64.b64encode(encoded_image).decode('utf-8')
-
+        # the annotated image is rendered on request, see overlay_cache
         return {
             "image": image_uuid,
-            "image_with_points": image_with_points_uuid
         }
 
-    def insert_images_db(self, image_id, session_id, image_url, facial_expression, with_points):
+    def user_owns_image(self, photo_id: str, user_id: int) -> bool:
         cursor = self.connection.cursor()
-        try:
-            cursor.execute(
-                """
-                    INSERT INTO photos (photo_id, session_id, photo_url, facial_expression, with_points)
-                    VALUES (%s, %s, %s, %s, %s)
-                """,
-                (image_id, session_id, image_url, facial_expression, with_points)
-            )
-            self.connection.commit()
-        except Exception as e:
-            self.connection.rollback()
-            raise e
-        finally:
-            cursor.close()
-
-    def _pre_process_image(self, file_path):
-        mp_file = mp.Image.create_from_file(file_path)
-        detection_result = get_face_landmarks_detection(file_path)
-
-        face_pts = get_px_pts_from_detection_result(
-            self.face_border_pts,
-            mp_file,
-            detection_result
-        )
+        cursor.execute(USER_OWNS_IMAGE_QUERY, (photo_id, user_id))
+        result = cursor.fetchone()
+        cursor.close()
+        return result is not None
+
+    def find_uploaded_image(self, session_id, facial_expression, content_hash):
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(FIND_UPLOADED_IMAGE_QUERY, (session_id, content_hash, facial_expression))
+        result = cursor.fetchone()
+        cursor.close()
+        return result['photo_id'] if result else None
+
+    def insert_images_db(self, image_id, session_id, image_url, facial_expression, with_points, content_hash=None):
+        self.insert_images_db_many([(image_id, session_id, image_url, facial_expression, with_points, content_hash)])
+
+    def insert_images_db_many(self, images: List[Tuple]):
+        """Inserts (photo_id, session_id, photo_url, facial_expression, with_points, content_hash) rows in one transaction."""
+        with UnitOfWork(self.connection) as unit_of_work:
+            unit_of_work.add_many(INSERT_IMAGE_QUERY, images)
+
+    def _pre_process_image(self, image_rgb: np.ndarray,
+                           source_transform: np.ndarray) -> Tuple[np.ndarray, ExpressionLandmarks, float]:
+        """Rotates and crops the face and returns the new image with its landmarks mapped onto it.
+
+        The landmarks are detected once; the rotation, the 90 degrees transpose and the crop are
+        composed into one affine transform, applied to the pixels in a single warp and to the
+        landmarks directly. Also returns the in-plane rotation applied to them in degrees, without
+        the right-angle steps, which map the landmarks exactly.
+        """
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)
+        detection_result = detect_face_landmarks(mp_image)
+
         eyes_pts = get_px_pts_from_detection_result(
             self.external_eye_pts,
-            mp_file,
+            mp_image,
             detection_result
         )
-
-        self._rotate_image(file_path, eyes_pts)
-        self.crop_face_image(self._get_face_limits(face_pts), file_path)
-
-
-    def _rotate_image(self, image_path, eyes_pts):
+        landmarks = ExpressionLandmarks.from_detection_result(detection_result, mp_image.width, mp_image.height,
+                                                              source_transform)
+
+        rotate_transform, rotated_width, rotated_height = self._rotate_image(mp_image.width, mp_image.height, eyes_pts)
+        rotation = _residual_rotation(math.degrees(math.atan2(rotate_transform[1][0], rotate_transform[0][0])))
+        rotated_points = apply_transform(landmarks.points, rotate_transform)
+        face_pts = [
+            {idx: (math.floor(rotated_points[idx][0]), math.floor(rotated_points[idx][1]))}
+            for idx in self.face_border_pts
+        ]
+        width, height, crop_transform = self.crop_face_image(self._get_face_limits(face_pts), rotated_width,
+                                                             rotated_height)
+
+        transform = crop_transform @ rotate_transform
+        return warp_image(image_rgb, transform, width, height), landmarks.transformed(transform, width, height), rotation
+
+    def _stored_crop(self, image_bytes: bytes, landmarks: ExpressionLandmarks,
+                     working_scale: np.ndarray) -> Tuple[np.ndarray, ExpressionLandmarks]:
+        """The crop found on the working copy, cut from a copy of the upload bounded by
+        MAX_STORED_RESOLUTION, and the landmarks mapped onto it."""
+        image_rgb, stored_scale = decode_image(image_bytes, settings.MAX_STORED_RESOLUTION)
+        width = round(landmarks.width * stored_scale[0][0] / working_scale[0][0])
+        height = round(landmarks.height * stored_scale[1][1] / working_scale[1][1])
+        landmarks = landmarks.resized(width, height)
+        # source_transform maps the upload onto the crop, the decoded copy is the upload scaled by stored_scale
+        transform = landmarks.source_transform @ np.linalg.inv(stored_scale)
+        return warp_image(image_rgb, transform, width, height), landmarks
+
+    def _rotate_image(self, width: int, height: int, eyes_pts) -> Tuple[np.ndarray, int, int]:
+        """Transform that levels the eyes (``PIL.Image.rotate(expand=True)``, then a 90 degrees
+        transpose if the result is portrait) and the size of the image it produces."""
         keypoints = {key: value for point in eyes_pts for key, value in point.items()}
         left_eye = keypoints[self.external_eye_pts[0]]
         right_eye = keypoints[self.external_eye_pts[1]]
         angle = self._calculate_rotation_angle(left_eye, right_eye)
 
-        with Image.open(image_path) as img:
-            rotated_img = img.rotate(-angle, resample=Image.BICUBIC, expand=True)
+        rotated_width, rotated_height = rotated_size(-angle, width, height)
+        transform = rotation_transform(-angle, width, height, rotated_width, rotated_height)
 
-            if rotated_img.height > rotated_img.width:
-                rotated_img = rotated_img.transpose(Image.ROTATE_90)
+        if rotated_height > rotated_width:
+            transform = rotate_90_transform(rotated_width) @ transform
+            rotated_width, rotated_height = rotated_height, rotated_width
 
-            rotated_img.save(image_path)
+        return transform, rotated_width, rotated_height
 
     def _calculate_rotation_angle(self, left_eye, right_eye):
         dx = right_eye[0] - left_eye[0]
@@ -169,58 +294,44 @@ class ImagesService:
 
         return [higher_horiz[1], higher_vert[1], lower_horiz[1], lower_vert[1]]
 
-    def crop_face_image(self, coordinates: List[Tuple[int, int]], file_path: str, offset_x_pct: float = 0.22,
-                        offset_y_pct: float = 0.22) -> None:
+    def crop_face_image(self, coordinates: List[Tuple[int, int]], width: int, height: int, offset_x_pct: float = 0.22,
+                        offset_y_pct: float = 0.22) -> Tuple[int, int, np.ndarray]:
+        """Size of the crop around the face limits, and the transform into it."""
         if len(coordinates) != 4:
             raise ValueError("O array de coordenadas deve conter exatamente 4 pontos.")
 
-        with Image.open(file_path) as img:
-            width, height = img.size
-            offset_x = int(width * offset_x_pct)
-            offset_y = int(height * offset_y_pct)
-
-            min_x = min(p[0] for p in coordinates) - offset_x
-            max_x = max(p[0] for p in coordinates) + offset_x
-            min_y = min(p[1] for p in coordinates) - offset_y
-            max_y = max(p[1] for p in coordinates) + offset_y
-
-            cropped_img = img.crop((min_x, min_y, max_x, max_y))
-            cropped_img.save(file_path)
-
-    def _draw_landmarks_on_image(self, rgb_image, detection_result):
-        face_landmarks_list = detection_result.face_landmarks
-        annotated_image = np.copy(rgb_image)
-
-        # Loop through the detected faces to visualize.
-        for idx in range(len(face_landmarks_list)):
-            face_landmarks = face_landmarks_list[idx]
-
-            # Draw the face landmarks.
-            face_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-            face_landmarks_proto.landmark.extend([
-                landmark_pb2.NormalizedLandmark(x=landmark.x, y=landmark.y, z=landmark.z) for landmark in face_landmarks
-            ])
-
-            solutions.drawing_utils.draw_landmarks(
-                image=annotated_image,
-                landmark_list=face_landmarks_proto,
-                connections=mp.solutions.face_mesh.FACEMESH_TESSELATION,
-                landmark_drawing_spec=None,
-                connection_drawing_spec=mp.solutions.drawing_styles
-                .get_default_face_mesh_tesselation_style())
-            solutions.drawing_utils.draw_landmarks(
-                image=annotated_image,
-                landmark_list=face_landmarks_proto,
-                connections=mp.solutions.face_mesh.FACEMESH_CONTOURS,
-                landmark_drawing_spec=None,
-                connection_drawing_spec=mp.solutions.drawing_styles
-                .get_default_face_mesh_contours_style())
-            solutions.drawing_utils.draw_landmarks(
-                image=annotated_image,
-                landmark_list=face_landmarks_proto,
-                connections=mp.solutions.face_mesh.FACEMESH_IRISES,
-                landmark_drawing_spec=None,
-                connection_drawing_spec=mp.solutions.drawing_styles
-                .get_default_face_mesh_iris_connections_style())
-
-        return annotated_image
+        offset_x = int(width * offset_x_pct)
+        offset_y = int(height * offset_y_pct)
+
+        min_x = min(p[0] for p in coordinates) - offset_x
+        max_x = max(p[0] for p in coordinates) + offset_x
+        min_y = min(p[1] for p in coordinates) - offset_y
+        max_y = max(p[1] for p in coordinates) + offset_y
+
+        return max_x - min_x, max_y - min_y, translation_transform(-min_x, -min_y)
+
+
+class AsyncImagesService:
+    """The photo queries of ImagesService used by the route handlers, on an aiomysql connection."""
+
+    def __init__(self, db_connection):
+        self.connection = db_connection
+
+    async def user_owns_image(self, photo_id: str, user_id: int) -> bool:
+        async with self.connection.cursor() as cursor:
+            await cursor.execute(USER_OWNS_IMAGE_QUERY, (photo_id, user_id))
+            return await cursor.fetchone() is not None
+
+    async def find_uploaded_image(self, session_id, facial_expression, content_hash):
+        async with self.connection.cursor(DictCursor) as cursor:
+            await cursor.execute(FIND_UPLOADED_IMAGE_QUERY, (session_id, content_hash, facial_expression))
+            result = await cursor.fetchone()
+        return result['photo_id'] if result else None
+
+    async def insert_images_db(self, image_id, session_id, image_url, facial_expression, with_points, content_hash=None):
+        await self.insert_images_db_many([(image_id, session_id, image_url, facial_expression, with_points, content_hash)])
+
+    async def insert_images_db_many(self, images: List[Tuple]):
+        """Inserts (photo_id, session_id, photo_url, facial_expression, with_points, content_hash) rows in one transaction."""
+        async with AsyncUnitOfWork(self.connection) as unit_of_work:
+            unit_of_work.add_many(INSERT_IMAGE_QUERY, images)
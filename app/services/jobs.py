@@ -0,0 +1,101 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.db.models.Session import SessionStatus
+from app.db.session import get_pool
+from app.services.sessions_service import SessionService
+
+
+class SessionJobQueue:
+    """Processes sessions in the background; each job checks out its own pooled database connection.
+
+    A queued or running session is ``pending``; a finished one is ``processed``. A failed job
+    puts the session back to the status it had before and stores the error with it, so any
+    worker can report it.
+    """
+
+    def __init__(self, max_workers: int):
+        # separate from the cpu-bound executor: a job fans its photos out to that executor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session-job")
+        self._lock = threading.Lock()
+        self._running = set()
+        self._failed = 0
+
+    def submit(self, user: dict, session_id: int) -> SessionStatus:
+        with self._lock:
+            if session_id in self._running:
+                return SessionStatus(session_id=session_id, status='pending')
+            self._running.add(session_id)
+
+        try:
+            previous_status = self._mark_pending(session_id, user['id'])
+            self._executor.submit(self._run, user, session_id, previous_status)
+        except Exception:
+            with self._lock:
+                self._running.discard(session_id)
+            raise
+        return SessionStatus(session_id=session_id, status='pending')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "failed": self._failed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _run(self, user: dict, session_id: int, previous_status: str):
+        try:
+            with get_pool().connection() as connection:
+                try:
+                    SessionService(connection).process_session(user, session_id)
+                except Exception as e:
+                    traceback.print_exc()
+                    with self._lock:
+                        self._failed += 1
+                    SessionService(connection).set_session_status(session_id, previous_status, str(e))
+        finally:
+            with self._lock:
+                self._running.discard(session_id)
+
+    @staticmethod
+    def _mark_pending(session_id: int, user_id: int) -> str:
+        """Sets the session ``pending`` and returns the status it had."""
+        with get_pool().connection() as connection:
+            session_service = SessionService(connection)
+            session = session_service.get_session(session_id, user_id)
+            if session is None:
+                raise ValueError("Sessão não encontrada.")
+            session_service.set_session_status(session_id, 'pending')
+            return session['status']
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_session_job_queue() -> SessionJobQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = SessionJobQueue(settings.SESSION_JOB_WORKERS)
+    return _queue
+
+
+def get_session_job_queue_stats():
+    if _queue is None:
+        return None
+    return _queue.stats()
+
+
+def shutdown_session_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue = None
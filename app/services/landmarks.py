@@ -0,0 +1,148 @@
+import io
+import math
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+def landmarks_to_px_array(face_landmarks, image_width: int, image_height: int) -> np.ndarray:
+    """Converts MediaPipe normalized landmarks to a (N, 3) float array in pixel space (z uses the width scale)."""
+    points = np.array([(landmark.x, landmark.y, landmark.z) for landmark in face_landmarks], dtype=np.float64)
+    return points * np.array([image_width, image_height, image_width], dtype=np.float64)
+
+
+def px_array_to_normalized(points: np.ndarray, image_width: int, image_height: int) -> np.ndarray:
+    return points / np.array([image_width, image_height, image_width], dtype=np.float64)
+
+
+def apply_transform(points: np.ndarray, transform: np.ndarray) -> np.ndarray:
+    """Applies a 3x3 2D affine transform to the x, y columns of a (N, 3) landmark array."""
+    transformed = points.copy()
+    transformed[:, :2] = points[:, :2] @ transform[:2, :2].T + transform[:2, 2]
+    return transformed
+
+
+def translation_transform(dx: float, dy: float) -> np.ndarray:
+    return np.array([[1.0, 0.0, dx],
+                     [0.0, 1.0, dy],
+                     [0.0, 0.0, 1.0]])
+
+
+def scale_transform(sx: float, sy: float) -> np.ndarray:
+    return np.array([[sx, 0.0, 0.0],
+                     [0.0, sy, 0.0],
+                     [0.0, 0.0, 1.0]])
+
+
+def rotation_transform(angle: float, width: int, height: int, new_width: int, new_height: int) -> np.ndarray:
+    """Forward transform of ``PIL.Image.rotate(angle, expand=True)``: counter-clockwise around the center."""
+    theta = math.radians(angle)
+    cos, sin = math.cos(theta), math.sin(theta)
+    rotation = np.array([[cos, sin, 0.0],
+                         [-sin, cos, 0.0],
+                         [0.0, 0.0, 1.0]])
+    return translation_transform(new_width / 2, new_height / 2) @ rotation @ translation_transform(-width / 2, -height / 2)
+
+
+def rotated_size(angle: float, width: int, height: int) -> Tuple[int, int]:
+    """Canvas size of ``PIL.Image.rotate(angle, expand=True)``, computed the way PIL does it."""
+    theta = -math.radians(angle % 360.0)
+    a, b = round(math.cos(theta), 15), round(math.sin(theta), 15)
+    d, e = -b, a
+    c = a * (-width / 2) + b * (-height / 2) + width / 2
+    f = d * (-width / 2) + e * (-height / 2) + height / 2
+    corners = ((0, 0), (width, 0), (width, height), (0, height))
+    xs = [a * x + b * y + c for x, y in corners]
+    ys = [d * x + e * y + f for x, y in corners]
+    return math.ceil(max(xs)) - math.floor(min(xs)), math.ceil(max(ys)) - math.floor(min(ys))
+
+
+def rotate_90_transform(width: int) -> np.ndarray:
+    """Forward transform of ``PIL.Image.transpose(Image.ROTATE_90)`` for an image of the given width."""
+    return np.array([[0.0, 1.0, 0.0],
+                     [-1.0, 0.0, width],
+                     [0.0, 0.0, 1.0]])
+
+
+class ExpressionLandmarks:
+    """Landmarks of one photo: a (478, 3) pixel-space array plus the size of the image they were detected on.
+
+    ``source_transform``, when known, maps pixel coordinates of the uploaded image onto that image.
+    """
+
+    def __init__(self, points: np.ndarray, width: int, height: int, blendshapes: Dict[str, float] = None,
+                 transformation_matrix: np.ndarray = None, source_transform: np.ndarray = None):
+        self.points = points
+        self.width = width
+        self.height = height
+        self.blendshapes = blendshapes
+        self.transformation_matrix = transformation_matrix
+        self.source_transform = source_transform
+
+    @classmethod
+    def from_detection_result(cls, detection_result, width: int, height: int,
+                              source_transform: np.ndarray = None) -> "ExpressionLandmarks":
+        if not len(detection_result.face_landmarks):
+            raise KeyError('Pontos faciais nao detectados')
+
+        blendshapes = None
+        if detection_result.face_blendshapes:
+            blendshapes = {
+                category.category_name: category.score for category in detection_result.face_blendshapes[0]
+            }
+        transformation_matrix = None
+        if detection_result.facial_transformation_matrixes:
+            transformation_matrix = np.asarray(detection_result.facial_transformation_matrixes[0], dtype=np.float64)
+
+        return cls(landmarks_to_px_array(detection_result.face_landmarks[0], width, height), width, height,
+                   blendshapes, transformation_matrix, source_transform)
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> "ExpressionLandmarks":
+        with np.load(io.BytesIO(content)) as data:
+            width, height = (int(value) for value in data["size"])
+            blendshapes = None
+            if "blendshape_names" in data:
+                blendshapes = dict(zip(data["blendshape_names"].tolist(), data["blendshape_scores"].tolist()))
+            transformation_matrix = data["transformation_matrix"] if "transformation_matrix" in data else None
+            source_transform = data["source_transform"] if "source_transform" in data else None
+            return cls(data["points"], width, height, blendshapes, transformation_matrix, source_transform)
+
+    def to_bytes(self) -> bytes:
+        arrays = {
+            "points": self.points,
+            "size": np.array([self.width, self.height], dtype=np.int64),
+        }
+        if self.blendshapes is not None:
+            arrays["blendshape_names"] = np.array(list(self.blendshapes.keys()))
+            arrays["blendshape_scores"] = np.array(list(self.blendshapes.values()), dtype=np.float32)
+        if self.transformation_matrix is not None:
+            arrays["transformation_matrix"] = self.transformation_matrix
+        if self.source_transform is not None:
+            arrays["source_transform"] = self.source_transform
+
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    def transformed(self, transform: np.ndarray, width: int, height: int) -> "ExpressionLandmarks":
+        """The same landmarks mapped through a 2D affine transform onto an image of the given size."""
+        source_transform = None if self.source_transform is None else transform @ self.source_transform
+        return ExpressionLandmarks(apply_transform(self.points, transform), width, height, self.blendshapes,
+                                   self.transformation_matrix, source_transform)
+
+    def resized(self, width: int, height: int) -> "ExpressionLandmarks":
+        """The same landmarks on this image scaled to the given size (z scales with the width)."""
+        sx, sy = width / self.width, height / self.height
+        source_transform = None if self.source_transform is None else scale_transform(sx, sy) @ self.source_transform
+        return ExpressionLandmarks(self.points * np.array([sx, sy, sx]), width, height, self.blendshapes,
+                                   self.transformation_matrix, source_transform)
+
+    def normalized(self) -> np.ndarray:
+        return px_array_to_normalized(self.points, self.width, self.height)
+
+    def source_points(self) -> np.ndarray:
+        """The landmarks in pixel coordinates of the uploaded image (z keeps this image's scale)."""
+        if self.source_transform is None:
+            raise ValueError("Transformacao para a imagem original desconhecida.")
+        return apply_transform(self.points, np.linalg.inv(self.source_transform))
@@ -0,0 +1,55 @@
+from typing import Dict, List, Tuple
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from app.services.landmarks import ExpressionLandmarks
+
+# (edge index array, color, thickness) groups of one connection set
+Layer = List[Tuple[np.ndarray, Tuple[int, int, int], int]]
+
+
+def _layer(connections, style) -> Layer:
+    """Groups a connection set into one (E, 2) index array per drawing style, keeping MediaPipe's edge order."""
+    groups: Dict[Tuple[Tuple[int, int, int], int], list] = {}
+    for connection in connections:
+        spec = style[connection] if isinstance(style, dict) else style
+        groups.setdefault((tuple(spec.color), spec.thickness), []).append(connection)
+    return [(np.array(edges, dtype=np.int64), color, thickness) for (color, thickness), edges in groups.items()]
+
+
+# same connections, colors and thicknesses as MediaPipe's default face mesh styles
+_face_mesh = mp.solutions.face_mesh
+_drawing_styles = mp.solutions.drawing_styles
+TESSELATION = _layer(_face_mesh.FACEMESH_TESSELATION, _drawing_styles.get_default_face_mesh_tesselation_style())
+CONTOURS = _layer(_face_mesh.FACEMESH_CONTOURS, _drawing_styles.get_default_face_mesh_contours_style())
+IRISES = _layer(_face_mesh.FACEMESH_IRISES, _drawing_styles.get_default_face_mesh_iris_connections_style())
+
+DETAIL_LAYERS = {
+    "full": [TESSELATION, CONTOURS, IRISES],
+    "contours": [CONTOURS, IRISES],
+}
+
+
+def render_overlay(image_rgb: np.ndarray, landmarks: ExpressionLandmarks, detail: str = "full") -> np.ndarray:
+    """Draws the face mesh on a copy of the image, one ``cv2.polylines`` call per layer and style.
+
+    Matches MediaPipe's ``draw_landmarks``: points are floored to pixels and edges touching a
+    landmark outside the image are skipped.
+    """
+    if detail not in DETAIL_LAYERS:
+        raise ValueError(f"Nivel de detalhe invalido: {detail}")
+
+    annotated_image = np.copy(image_rgb)
+    height, width = annotated_image.shape[:2]
+    normalized = landmarks.normalized()[:, :2]
+    visible = np.all((normalized >= 0) & (normalized <= 1), axis=1)
+    px = np.minimum(np.floor(normalized * [width, height]), [width - 1, height - 1]).astype(np.int32)
+
+    for layer in DETAIL_LAYERS[detail]:
+        for edges, color, thickness in layer:
+            edges = edges[visible[edges].all(axis=1)]
+            if len(edges):
+                cv2.polylines(annotated_image, list(px[edges]), False, color, thickness)
+    return annotated_image
@@ -0,0 +1,122 @@
+import os
+import threading
+import uuid
+from typing import Optional
+
+import cv2
+
+from app.core.config import settings
+from app.core.storage import get_storage
+from app.services.images_service import decode_image
+from app.services.overlay import render_overlay
+from app.services.sessions_service import load_photo_landmarks
+
+
+def render_overlay_jpeg(photo_id: str, detail: str) -> Optional[bytes]:
+    """Annotated JPEG of a stored photo, drawn from its stored landmarks; None when the photo does not exist."""
+    try:
+        image_rgb, _ = decode_image(get_storage().read(f"{photo_id}.jpg"))
+    except FileNotFoundError:
+        return None
+
+    annotated_image = render_overlay(image_rgb, load_photo_landmarks(photo_id), detail)
+    _, encoded_image = cv2.imencode('.jpg', cv2.cvtColor(annotated_image, cv2.COLOR_RGB2BGR))
+    return encoded_image.tobytes()
+
+
+class OverlayCache:
+    """Rendered overlays on local disk, evicted least recently used first once they exceed ``max_bytes``.
+
+    A per-host cache, deliberately outside Storage: an overlay is derived from the stored photo and
+    landmarks, so each host keeps its own copies and re-renders them on a miss, with any backend.
+    Recency is the file mtime, touched on every hit, so the order survives restarts and is
+    shared by the workers using the same directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".jpg"))
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _path(self, photo_id: str, detail: str) -> str:
+        return os.path.join(self.directory, f"{photo_id}.{detail}.jpg")
+
+    def get(self, photo_id: str, detail: str) -> Optional[bytes]:
+        # read here rather than served by path, which another request may evict mid-response
+        path = self._path(photo_id, detail)
+        try:
+            with open(path, "rb") as file:
+                content = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return content
+
+    def put(self, photo_id: str, detail: str, content: bytes) -> None:
+        path = self._path(photo_id, detail)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(content)
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+
+    def _evict(self, keep: str):
+        # trims to 90% of the limit so a full cache does not rescan the directory on every insert
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith(".jpg")),
+                         key=lambda entry: entry.stat().st_mtime)
+        self._size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            if entry.path == keep:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            self._evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_overlay_cache() -> OverlayCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OverlayCache(settings.OVERLAY_CACHE_DIR, settings.OVERLAY_CACHE_MAX_BYTES)
+    return _cache
+
+
+def get_overlay_cache_stats():
+    if _cache is None:
+        return None
+    return _cache.stats()
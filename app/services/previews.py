@@ -0,0 +1,48 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.core.storage import get_storage
+
+# same quality the endpoints used to re-encode with on every request
+PREVIEW_JPEG_QUALITY = 30
+
+
+def preview_key(photo_id: str) -> str:
+    return f"{photo_id}.preview.jpg"
+
+
+def encode_preview(image_bgr: np.ndarray) -> bytes:
+    _, encoded_image = cv2.imencode('.jpg', image_bgr, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY])
+    return encoded_image.tobytes()
+
+
+def _create_preview(photo_id: str) -> Optional[bytes]:
+    storage = get_storage()
+    try:
+        original = storage.read(f"{photo_id}.jpg")
+    except FileNotFoundError:
+        return None
+    image_bgr = cv2.imdecode(np.frombuffer(original, np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image_bgr is None:
+        return None
+
+    preview = encode_preview(image_bgr)
+    storage.write(preview_key(photo_id), preview)
+    return preview
+
+
+def get_preview(photo_id: str) -> Optional[bytes]:
+    """Stored low-quality JPEG of a photo, generated on first access for photos uploaded before previews existed."""
+    try:
+        return get_storage().read(preview_key(photo_id))
+    except FileNotFoundError:
+        return _create_preview(photo_id)
+
+
+def ensure_preview(photo_id: str) -> Optional[str]:
+    """Storage key of the preview, generating it if needed; None when the photo does not exist."""
+    if get_storage().exists(preview_key(photo_id)) or _create_preview(photo_id) is not None:
+        return preview_key(photo_id)
+    return None
@@ -0,0 +1,296 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.models.Session import SessionResult
+
+try:
+    import redis
+except ImportError:  # only needed with RESULT_CACHE_BACKEND=redis
+    redis = None
+
+
+class ResultCache(ABC):
+    """Scores of processed sessions keyed by (session, user), stored without their photos.
+
+    A processed result only changes when the session is processed again, which invalidates it;
+    the TTL bounds how long another worker may serve it after that.
+
+    A read-through takes the ``generations`` of the sessions it misses before querying the database
+    and hands them to ``put_many``, which skips every session invalidated in between, so a result
+    read just before it was replaced is not stored back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._stale_puts = 0
+
+    @abstractmethod
+    def _get_many(self, user_id: int, session_ids: List[int]) -> Dict[int, SessionResult]:
+        ...
+
+    @abstractmethod
+    def _generations(self, user_id: int, session_ids: List[int]) -> Dict[int, object]:
+        ...
+
+    @abstractmethod
+    def _put_many(self, user_id: int, results: List[SessionResult], generations: Dict[int, object]) -> int:
+        """Stores the results whose generation is unchanged and returns how many were skipped."""
+
+    @abstractmethod
+    def _invalidate(self, session_id: int, user_id: int) -> None:
+        ...
+
+    def get_many(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, SessionResult]:
+        session_ids = list(session_ids)
+        found = self._get_many(user_id, session_ids) if session_ids else {}
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(session_ids) - len(found)
+        return found
+
+    def generations(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, object]:
+        session_ids = list(session_ids)
+        return self._generations(user_id, session_ids) if session_ids else {}
+
+    def put_many(self, user_id: int, results: Iterable[SessionResult], generations: Dict[int, object]) -> None:
+        results = [result.model_copy(update={"photos": []}) for result in results
+                   if result.session_id in generations]
+        if results:
+            skipped = self._put_many(user_id, results, generations)
+            with self._lock:
+                self._stale_puts += skipped
+
+    def invalidate(self, session_id: int, user_id: int) -> None:
+        self._invalidate(session_id, user_id)
+        with self._lock:
+            self._invalidations += 1
+
+    async def aget_many(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, SessionResult]:
+        return await run_in_threadpool(self.get_many, user_id, session_ids)
+
+    async def agenerations(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, object]:
+        return await run_in_threadpool(self.generations, user_id, session_ids)
+
+    async def aput_many(self, user_id: int, results: Iterable[SessionResult], generations: Dict[int, object]) -> None:
+        await run_in_threadpool(self.put_many, user_id, results, generations)
+
+    def _size(self):
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": type(self).__name__,
+                "entries": self._size(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "stale_puts": self._stale_puts,
+            }
+
+
+class MemoryResultCache(ResultCache):
+    """Per-process LRU of at most ``max_entries`` results, each kept for ``ttl`` seconds.
+
+    Only this process sees its invalidations: with several workers, the others keep serving a
+    replaced result until it expires.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (session_id, user_id) -> (expires_at, result), least recently used first
+        self._entries = OrderedDict()
+        # generations are ticks of a clock advanced by every invalidation: (session_id, user_id) -> tick
+        # of its last invalidation, at most max_entries of them; forgotten ones count as invalidated
+        # at _floor, which only makes older puts be skipped
+        self._clock = 0
+        self._invalidated = OrderedDict()
+        self._floor = 0
+
+    def _get_many(self, user_id: int, session_ids: List[int]) -> Dict[int, SessionResult]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for session_id in session_ids:
+                key = (session_id, user_id)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[session_id] = entry[1]
+        return found
+
+    def _generations(self, user_id: int, session_ids: List[int]) -> Dict[int, object]:
+        with self._lock:
+            return {session_id: self._clock for session_id in session_ids}
+
+    def _put_many(self, user_id: int, results: List[SessionResult], generations: Dict[int, object]) -> int:
+        expires_at = time.monotonic() + self.ttl
+        skipped = 0
+        with self._lock:
+            for result in results:
+                key = (result.session_id, user_id)
+                if self._invalidated.get(key, self._floor) > generations[result.session_id]:
+                    skipped += 1
+                    continue
+                self._entries[key] = (expires_at, result)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return skipped
+
+    def _invalidate(self, session_id: int, user_id: int) -> None:
+        key = (session_id, user_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._clock += 1
+            self._invalidated[key] = self._clock
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_entries:
+                self._floor = self._invalidated.popitem(last=False)[1]
+
+    # nothing to wait for in memory, so the async callers skip the threadpool
+    async def aget_many(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, SessionResult]:
+        return self.get_many(user_id, session_ids)
+
+    async def agenerations(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, object]:
+        return self.generations(user_id, session_ids)
+
+    async def aput_many(self, user_id: int, results: Iterable[SessionResult], generations: Dict[int, object]) -> None:
+        self.put_many(user_id, results, generations)
+
+    def _size(self):
+        return len(self._entries)
+
+
+class RedisResultCache(ResultCache):
+    """Results shared by every worker in Redis (``client`` may be any redis-py compatible stand-in);
+    Redis expires them after ``ttl`` seconds and evicts by its own ``maxmemory-policy``.
+
+    The generation of a session is a counter key incremented by ``invalidate``; ``put_many`` watches
+    those keys, so an invalidation from any worker between the read and the put discards the put.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "session-result:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float, prefix: str = "session-result:") -> "RedisResultCache":
+        if redis is None:
+            raise RuntimeError("RESULT_CACHE_BACKEND=redis requer o pacote redis")
+        return cls(redis.Redis.from_url(url), ttl, prefix)
+
+    def _key(self, session_id: int, user_id: int) -> str:
+        return f"{self.prefix}{user_id}:{session_id}"
+
+    def _generation_key(self, session_id: int, user_id: int) -> str:
+        return f"{self.prefix}generation:{user_id}:{session_id}"
+
+    def _get_many(self, user_id: int, session_ids: List[int]) -> Dict[int, SessionResult]:
+        values = self.client.mget([self._key(session_id, user_id) for session_id in session_ids])
+        return {
+            session_id: SessionResult.model_validate_json(value)
+            for session_id, value in zip(session_ids, values) if value is not None
+        }
+
+    def _generations(self, user_id: int, session_ids: List[int]) -> Dict[int, object]:
+        values = self.client.mget([self._generation_key(session_id, user_id) for session_id in session_ids])
+        return dict(zip(session_ids, values))
+
+    def _put_many(self, user_id: int, results: List[SessionResult], generations: Dict[int, object]) -> int:
+        generation_keys = [self._generation_key(result.session_id, user_id) for result in results]
+        with self.client.pipeline() as pipeline:
+            pipeline.watch(*generation_keys)
+            current = pipeline.mget(generation_keys)
+            pipeline.multi()
+            stored = 0
+            for result, generation in zip(results, current):
+                if generation == generations[result.session_id]:
+                    pipeline.set(self._key(result.session_id, user_id), result.model_dump_json(),
+                                 px=int(self.ttl * 1000))
+                    stored += 1
+            try:
+                pipeline.execute()
+            except redis.WatchError:
+                # invalidated between the check and the write
+                stored = 0
+        return len(results) - stored
+
+    def _invalidate(self, session_id: int, user_id: int) -> None:
+        generation_key = self._generation_key(session_id, user_id)
+        pipeline = self.client.pipeline()
+        pipeline.incr(generation_key)
+        # outlives any read-through that started before the invalidation
+        pipeline.pexpire(generation_key, int(self.ttl * 1000))
+        pipeline.delete(self._key(session_id, user_id))
+        pipeline.execute()
+
+
+class NoResultCache(ResultCache):
+    """RESULT_CACHE_BACKEND=none: every lookup is a miss."""
+
+    def _get_many(self, user_id: int, session_ids: List[int]) -> Dict[int, SessionResult]:
+        return {}
+
+    def _generations(self, user_id: int, session_ids: List[int]) -> Dict[int, object]:
+        return {}
+
+    def _put_many(self, user_id: int, results: List[SessionResult], generations: Dict[int, object]) -> int:
+        return 0
+
+    def _invalidate(self, session_id: int, user_id: int) -> None:
+        pass
+
+    async def aget_many(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, SessionResult]:
+        return self.get_many(user_id, session_ids)
+
+    async def agenerations(self, user_id: int, session_ids: Iterable[int]) -> Dict[int, object]:
+        return {}
+
+    async def aput_many(self, user_id: int, results: Iterable[SessionResult], generations: Dict[int, object]) -> None:
+        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if settings.RESULT_CACHE_BACKEND == "memory":
+                    _cache = MemoryResultCache(settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL)
+                elif settings.RESULT_CACHE_BACKEND == "redis":
+                    _cache = RedisResultCache.from_url(settings.RESULT_CACHE_REDIS_URL, settings.RESULT_CACHE_TTL)
+                elif settings.RESULT_CACHE_BACKEND == "none":
+                    _cache = NoResultCache()
+                else:
+                    raise ValueError(f"RESULT_CACHE_BACKEND invalido: {settings.RESULT_CACHE_BACKEND}")
+    return _cache
+
+
+def get_result_cache_stats():
+    if _cache is None:
+        return None
+    return _cache.stats()
@@ -1,14 +1,162 @@
 import datetime
-import math
-import os
-from typing import Tuple, Union, Literal, List, Dict
+from collections import defaultdict
+from typing import List, Dict, Optional, Tuple
 import mediapipe as mp
-import mysql
-from PIL import Image
-import io
+import numpy as np
+import mysql.connector
 import base64
+from app.core.executor import get_executor, run_blocking
+from app.core.storage import get_storage
+from app.db.async_session import DictCursor
+from app.db.unit_of_work import UnitOfWork
 from app.db.models.Session import SessionResult
-from app.services.images_service import get_face_landmarks_detection, get_px_pts_from_detection_result
+from app.services.images_service import decode_image, detect_face_landmarks
+from app.services.geometry import FaceGeometry, features_from_bytes, photo_features
+from app.services.landmarks import ExpressionLandmarks
+from app.services.previews import get_preview
+from app.services.result_cache import get_result_cache
+
+
+NEW_SESSION_QUERY = """
+    INSERT INTO sessions (user_id)
+    VALUES (%s)
+"""
+
+# a page of the processed sessions of a user; {after_session} narrows to the next page
+GET_SESSION_IDS_QUERY = """
+    SELECT s.session_id
+    FROM sessions as s
+    WHERE s.user_id = %s {after_session}
+        and EXISTS (SELECT 1 FROM results as r WHERE r.session_id = s.session_id)
+    ORDER BY s.session_id DESC
+    LIMIT %s
+"""
+
+# the latest result of each session
+GET_SESSIONS_QUERY = """
+    SELECT
+        r.session_id,
+        r.hb_eyes_simetry,
+        r.hb_mouth_simetry,
+        r.sb_forehead_wrinkle_simetry,
+        r.sb_gentle_eye_closure_simetry,
+        r.sb_smile_simetry,
+        r.sb_snarl_simetry,
+        r.sb_lip_pucker_simetry,
+        r.eyes_synkinesis,
+        r.eyebrows_synkinesis,
+        r.mouth_synkinesis,
+        r.mouth_synkinesis_by_raising_eyebrows,
+        r.eyebrows_synkinesis_by_closing_eyes,
+        r.mouth_synkinesis_by_closing_eyes,
+        r.eyebrows_synkinesis_by_smiling,
+        r.eyes_synkinesis_by_smiling,
+        r.eyes_synkinesis_by_snarl,
+        r.eyebrows_synkinesis_by_lip_pucker,
+        r.eyes_synkinesis_by_lip_pucker,
+        r.house_brackmann,
+        r.sunnybrook,
+        r.processed_at
+    FROM results as r
+    WHERE r.session_id IN ({session_ids})
+        and r.result_id = (SELECT MAX(latest.result_id) FROM results as latest WHERE latest.session_id = r.session_id)
+"""
+
+GET_SESSIONS_PHOTOS_QUERY = """
+    SELECT session_id, photo_id
+    FROM photos
+    WHERE with_points = FALSE and session_id IN ({session_ids})
+"""
+
+GET_SESSION_IMAGES_QUERY = "select photo_id, facial_expression from photos as p where p.session_id = %s and p.with_points = FALSE"
+
+GET_SESSION_QUERY = "select session_id, status, error from sessions where session_id = %s and user_id = %s"
+
+SET_SESSION_STATUS_QUERY = "UPDATE sessions SET status = %s, error = NULL WHERE session_id = %s"
+
+SET_SESSION_ERROR_QUERY = "UPDATE sessions SET status = %s, error = %s WHERE session_id = %s"
+
+INSERT_RESULT_QUERY = """
+    INSERT INTO results (
+        session_id, house_brackmann, sunnybrook, hb_eyes_simetry, hb_mouth_simetry,
+        sb_forehead_wrinkle_simetry, sb_gentle_eye_closure_simetry, sb_smile_simetry,
+        sb_snarl_simetry, sb_lip_pucker_simetry, eyes_synkinesis, eyebrows_synkinesis,
+        mouth_synkinesis, mouth_synkinesis_by_raising_eyebrows, eyebrows_synkinesis_by_closing_eyes,
+        mouth_synkinesis_by_closing_eyes, eyebrows_synkinesis_by_smiling, eyes_synkinesis_by_smiling,
+        eyes_synkinesis_by_snarl, eyebrows_synkinesis_by_lip_pucker, eyes_synkinesis_by_lip_pucker
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+GET_SESSION_RESULT_QUERY = """
+    SELECT *
+    FROM results
+    WHERE session_id = %s
+    ORDER BY result_id DESC
+    LIMIT 1
+"""
+
+
+def session_ids_query(user_id: int, after_session_id: Optional[int], limit: int) -> Tuple[str, tuple]:
+    """A page of the session history, newest first; ``after_session_id`` is the last session of the previous page."""
+    if after_session_id is None:
+        return GET_SESSION_IDS_QUERY.format(after_session=""), (user_id, limit)
+    return GET_SESSION_IDS_QUERY.format(after_session="and s.session_id < %s"), (user_id, after_session_id, limit)
+
+
+def _in_query(query: str, session_ids: List[int]) -> Tuple[str, tuple]:
+    return query.format(session_ids=", ".join(["%s"] * len(session_ids))), tuple(session_ids)
+
+
+def sessions_query(session_ids: List[int]) -> Tuple[str, tuple]:
+    return _in_query(GET_SESSIONS_QUERY, session_ids)
+
+
+def sessions_photos_query(session_ids: List[int]) -> Tuple[str, tuple]:
+    return _in_query(GET_SESSIONS_PHOTOS_QUERY, session_ids)
+
+
+def session_results(session_ids: List[int], results: Dict[int, SessionResult], photos: List[Dict] = ()) -> List[SessionResult]:
+    session_photos = defaultdict(list)
+    for photo in photos:
+        session_photos[photo['session_id']].append(f"/images/{photo['photo_id']}?variant=preview")
+    return [
+        results[session_id].model_copy(update={'photos': session_photos[session_id]})
+        for session_id in session_ids if session_id in results
+    ]
+
+
+def load_photo_landmarks(photo_id: str) -> ExpressionLandmarks:
+    try:
+        return ExpressionLandmarks.from_bytes(get_storage().read(f"{photo_id}.npz"))
+    except FileNotFoundError:
+        pass
+
+    # photos uploaded before the landmarks were persisted
+    image_rgb, _ = decode_image(get_storage().read(f"{photo_id}.jpg"))
+    return ExpressionLandmarks.from_detection_result(
+        detect_face_landmarks(mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)),
+        image_rgb.shape[1],
+        image_rgb.shape[0]
+    )
+
+
+def load_photo_features(photo_id: str) -> Dict[str, np.ndarray]:
+    try:
+        return features_from_bytes(get_storage().read(f"{photo_id}.features.npz"))
+    except FileNotFoundError:
+        pass
+
+    # photos uploaded before the features were computed at upload
+    return photo_features(load_photo_landmarks(photo_id))
+
+
+def encode_session_images(images: List[Dict]) -> List[str]:
+    imagesB64 = []
+    for item in images:
+        preview = get_preview(item['photo_id'])
+        if preview:
+            imagesB64.append("data:image/jpeg;base64," + base64.b64encode(preview).decode("utf-8"))
+    return imagesB64
 
 
 class SessionService:
@@ -36,31 +184,12 @@ class SessionService:
         self.eyebrows_synkinesis_by_lip_pucker = False
         self.eyes_synkinesis_by_lip_pucker = False
 
-        self.mid_forhead_pt = 10
-        self.right_eyebrow_pts = [70, 63, 105, 66, 107, 46, 53, 52, 65, 55]
-        self.left_eyebrow_pts = [300, 293, 334, 296, 336, 276, 283, 282, 295, 285]
-        self.average_line_pt = 168
-        self.mid_mouth_end_pt = 13
-        self.right_mouth_end_pt = 61
-        self.left_mouth_end_pt = 291
-        self.right_eye_open_pts = [159, 145]
-        self.left_eye_open_pts = [386, 374]
-        self.alar_base_pts = [48, 278]
-        self.right_mouth_lip_p_pts = [58, 61]
-        self.left_mouth_lip_p_pts = [288, 291]
-
 
     def new_session(self, user_id: int):
         cursor = self.connection.cursor()
 
         try:
-            cursor.execute(
-                """
-                    INSERT INTO sessions (user_id)
-                    VALUES (%s)
-                """,
-                (user_id,)
-            )
+            cursor.execute(NEW_SESSION_QUERY, (user_id,))
             self.connection.commit()
 
             return {
@@ -72,144 +201,103 @@ class SessionService:
         finally:
             cursor.close()
 
-    def get_sessions(self, user_id):
+    def end_session(self, session_id, house_brackmann, sunnybrook):
+        values = (session_id, house_brackmann, sunnybrook, self.hb_eyes_simetry, self.hb_mouth_simetry,
+                  self.sb_forehead_wrinkle_simetry, self.sb_gentle_eye_closure_simetry, self.sb_smile_simetry,
+                  self.sb_snarl_simetry, self.sb_lip_pucker_simetry, self.synkinesis_eyes, self.synkinesis_eyebrows,
+                  self.synkinesis_mouth, self.mouth_synkinesis_by_raising_eyebrows,
+                  self.eyebrows_synkinesis_by_closing_eyes,
+                  self.mouth_synkinesis_by_closing_eyes, self.eyebrows_synkinesis_by_smiling,
+                  self.eyes_synkinesis_by_smiling,
+                  self.eyes_synkinesis_by_snarl, self.eyebrows_synkinesis_by_lip_pucker,
+                  self.eyes_synkinesis_by_lip_pucker)
+
+        # the result and the status change are committed together
+        with UnitOfWork(self.connection) as unit_of_work:
+            unit_of_work.add(INSERT_RESULT_QUERY, values)
+            unit_of_work.add(SET_SESSION_STATUS_QUERY, ('processed', session_id))
+
+    def get_session_images(self, session_id: int):
         cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT
-                s.session_id,
-                p.photo_id,    
-                hb_eyes_simetry,
-                hb_mouth_simetry,
-                sb_forehead_wrinkle_simetry,
-                sb_gentle_eye_closure_simetry,
-                sb_smile_simetry,
-                sb_snarl_simetry,
-                sb_lip_pucker_simetry,
-                eyes_synkinesis,
-                eyebrows_synkinesis,
-                mouth_synkinesis, 
-                mouth_synkinesis_by_raising_eyebrows, 
-                eyebrows_synkinesis_by_closing_eyes,
-                mouth_synkinesis_by_closing_eyes, 
-                eyebrows_synkinesis_by_smiling, 
-                eyes_synkinesis_by_smiling,
-                eyes_synkinesis_by_snarl, 
-                eyebrows_synkinesis_by_lip_pucker, 
-                eyes_synkinesis_by_lip_pucker,    
-                house_brackmann,
-                sunnybrook,
-                processed_at
-            FROM `facial-palsy-db`.results as r
-                join `facial-palsy-db`.sessions as s
-                    on s.session_id = r.session_id
-                join `facial-palsy-db`.photos as p
-                    on s.session_id = p.session_id 
-            where s.user_id = %s;
-        """, (user_id,))
+        cursor.execute(GET_SESSION_IMAGES_QUERY, (session_id,))
         result = cursor.fetchall()
         cursor.close()
         return result
 
-    def end_session(self, session_id, house_brackmann, sunnybrook):
-        cursor = self.connection.cursor()
-        try:
-            query = """
-                    INSERT INTO results (
-                        session_id, house_brackmann, sunnybrook, hb_eyes_simetry, hb_mouth_simetry,
-                        sb_forehead_wrinkle_simetry, sb_gentle_eye_closure_simetry, sb_smile_simetry,
-                        sb_snarl_simetry, sb_lip_pucker_simetry, eyes_synkinesis, eyebrows_synkinesis,
-                        mouth_synkinesis, mouth_synkinesis_by_raising_eyebrows, eyebrows_synkinesis_by_closing_eyes,
-                        mouth_synkinesis_by_closing_eyes, eyebrows_synkinesis_by_smiling, eyes_synkinesis_by_smiling,
-                        eyes_synkinesis_by_snarl, eyebrows_synkinesis_by_lip_pucker, eyes_synkinesis_by_lip_pucker
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-
-            values = (session_id, house_brackmann, sunnybrook, self.hb_eyes_simetry, self.hb_mouth_simetry,
-                      self.sb_forehead_wrinkle_simetry, self.sb_gentle_eye_closure_simetry, self.sb_smile_simetry,
-                      self.sb_snarl_simetry, self.sb_lip_pucker_simetry, self.synkinesis_eyes, self.synkinesis_eyebrows,
-                      self.synkinesis_mouth, self.mouth_synkinesis_by_raising_eyebrows,
-                      self.eyebrows_synkinesis_by_closing_eyes,
-                      self.mouth_synkinesis_by_closing_eyes, self.eyebrows_synkinesis_by_smiling,
-                      self.eyes_synkinesis_by_smiling,
-                      self.eyes_synkinesis_by_snarl, self.eyebrows_synkinesis_by_lip_pucker,
-                      self.eyes_synkinesis_by_lip_pucker)
-            cursor.execute(query, values)
-            self.connection.commit()
-            return
-        except Exception as e:
-            self.connection.rollback()
-            raise e
-        finally:
-            cursor.close()
-
-    def get_session_images(self, session_id: int):
+    def get_session(self, session_id: int, user_id: int):
         cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("select photo_id, facial_expression from photos as p where p.session_id = %s and p.with_points = FALSE", (session_id,))
-        result = cursor.fetchall()
+        cursor.execute(GET_SESSION_QUERY, (session_id, user_id))
+        result = cursor.fetchone()
         cursor.close()
         return result
 
+    def set_session_status(self, session_id: int, status: str, error: Optional[str] = None):
+        with UnitOfWork(self.connection) as unit_of_work:
+            if error is None:
+                unit_of_work.add(SET_SESSION_STATUS_QUERY, (status, session_id))
+            else:
+                unit_of_work.add(SET_SESSION_ERROR_QUERY, (status, error, session_id))
+
+    def encode_session_images(self, images: List[Dict]) -> List[str]:
+        return encode_session_images(images)
+
     def process_session(self, user, session_id: int) -> SessionResult:
         images = self.get_session_images(session_id)
-        results_by_expression = self._process_images(images)
+        geometry = FaceGeometry.from_features(self._process_images(images))
 
-        house_brackmann_score = self.get_house_brackmann_classif(results_by_expression)
-        sunnybrook_score = self.get_sunnybrook_classif(results_by_expression, user)
+        scores = self.score_session(geometry, user)
 
-        imagesB64 = []
-        for item in images:
-            photo_path = os.path.join(os.getcwd(), f"app/assets/{item['photo_id']}.jpg")
-            base64_image = self.file_to_base64(photo_path, compression_level=30)
-            if base64_image:
-                imagesB64.append("data:image/jpeg;base64," + base64_image)
+        imagesB64 = self.encode_session_images(images)
 
-        self.end_session(session_id, house_brackmann_score, sunnybrook_score)
+        self.end_session(session_id, scores['house_brackmann'], scores['sunnybrook'])
+        get_result_cache().invalidate(session_id, user['id'])
         return SessionResult(
             session_id=session_id,
-            house_brackmann=house_brackmann_score,
-            sunnybrook=sunnybrook_score,
-            # house_brackmann="I",
-            # sunnybrook='90',
-            hb_eyes_simetry=self.hb_eyes_simetry,
-            hb_mouth_simetry=self.hb_mouth_simetry,
-            sb_forehead_wrinkle_simetry=self.sb_forehead_wrinkle_simetry,
-            sb_gentle_eye_closure_simetry=self.sb_gentle_eye_closure_simetry,
-            sb_smile_simetry=self.sb_smile_simetry,
-            sb_snarl_simetry=self.sb_snarl_simetry,
-            sb_lip_pucker_simetry=self.sb_lip_pucker_simetry,
-            eyes_synkinesis=self.synkinesis_eyes,
-            eyebrows_synkinesis=self.synkinesis_eyebrows,
-            mouth_synkinesis=self.synkinesis_mouth,
-            mouth_synkinesis_by_raising_eyebrows=self.mouth_synkinesis_by_raising_eyebrows,
-            eyebrows_synkinesis_by_closing_eyes=self.eyebrows_synkinesis_by_closing_eyes,
-            mouth_synkinesis_by_closing_eyes=self.mouth_synkinesis_by_closing_eyes,
-            eyebrows_synkinesis_by_smiling=self.eyebrows_synkinesis_by_smiling,
-            eyes_synkinesis_by_smiling=self.eyes_synkinesis_by_smiling,
-            eyes_synkinesis_by_snarl=self.eyes_synkinesis_by_snarl,
-            eyebrows_synkinesis_by_lip_pucker=self.eyebrows_synkinesis_by_lip_pucker,
-            eyes_synkinesis_by_lip_pucker=self.eyes_synkinesis_by_lip_pucker,
+            **scores,
             processed_at=datetime.datetime.now(),
             photos=imagesB64,
             # photos_with_poitns=['TBD'],
         )
 
-    def _process_images(self, images: List[Dict]) -> List[Dict]:
-        current_directory = os.getcwd()
-        results = []
-
-        for image in images:
-            file_path = os.path.join(current_directory, f"app/assets/{image.get('photo_id')}.jpg")
-            results.append({
-                image.get('facial_expression'): {
-                    "result": get_face_landmarks_detection(file_path),
-                    "file_path": file_path,
-                }
-            })
-        return results
-
-    def get_house_brackmann_classif(self, results_by_expression):
-        eyebrow_score = self.calculate_HB_eyebrow_score(results_by_expression)
-        mouth_score = self.calculate_HB_mouth_score(results_by_expression)
+    def score_session(self, geometry: FaceGeometry, user) -> Dict:
+        """Runs the HB and SB classifications; the returned keys are the columns of ``results``."""
+        house_brackmann_score = self.get_house_brackmann_classif(geometry)
+        sunnybrook_score = self.get_sunnybrook_classif(geometry, user)
+
+        return {
+            'house_brackmann': house_brackmann_score,
+            'sunnybrook': sunnybrook_score,
+            'hb_eyes_simetry': self.hb_eyes_simetry,
+            'hb_mouth_simetry': self.hb_mouth_simetry,
+            'sb_forehead_wrinkle_simetry': self.sb_forehead_wrinkle_simetry,
+            'sb_gentle_eye_closure_simetry': self.sb_gentle_eye_closure_simetry,
+            'sb_smile_simetry': self.sb_smile_simetry,
+            'sb_snarl_simetry': self.sb_snarl_simetry,
+            'sb_lip_pucker_simetry': self.sb_lip_pucker_simetry,
+            'eyes_synkinesis': self.synkinesis_eyes,
+            'eyebrows_synkinesis': self.synkinesis_eyebrows,
+            'mouth_synkinesis': self.synkinesis_mouth,
+            'mouth_synkinesis_by_raising_eyebrows': self.mouth_synkinesis_by_raising_eyebrows,
+            'eyebrows_synkinesis_by_closing_eyes': self.eyebrows_synkinesis_by_closing_eyes,
+            'mouth_synkinesis_by_closing_eyes': self.mouth_synkinesis_by_closing_eyes,
+            'eyebrows_synkinesis_by_smiling': self.eyebrows_synkinesis_by_smiling,
+            'eyes_synkinesis_by_smiling': self.eyes_synkinesis_by_smiling,
+            'eyes_synkinesis_by_snarl': self.eyes_synkinesis_by_snarl,
+            'eyebrows_synkinesis_by_lip_pucker': self.eyebrows_synkinesis_by_lip_pucker,
+            'eyes_synkinesis_by_lip_pucker': self.eyes_synkinesis_by_lip_pucker,
+        }
+
+    def _process_images(self, images: List[Dict]) -> Dict[str, Dict[str, np.ndarray]]:
+        photo_ids = [image.get('photo_id') for image in images]
+
+        # features are normally precomputed at upload; only older photos need a landmark load or a detection,
+        # so the fan-out keeps one task per photo and map keeps the session order to pair them with their expression
+        features = get_executor().map(load_photo_features, photo_ids)
+        return {image.get('facial_expression'): item for image, item in zip(images, features)}
+
+    def get_house_brackmann_classif(self, geometry: FaceGeometry):
+        eyebrow_score = self.calculate_HB_eyebrow_score(geometry)
+        mouth_score = self.calculate_HB_mouth_score(geometry)
         print('\nHB eyebrow_score', eyebrow_score)
         print('HB mouth_score', mouth_score)
         self.hb_eyes_simetry = self.calculate_HB_simetry_score(eyebrow_score)
@@ -217,26 +305,17 @@ class SessionService:
 
         return self.calculate_HB_total_score(eyebrow_score + mouth_score)
 
-    def calculate_HB_eyebrow_score(self, results_by_expression):
-        # print('\ncalculate_HB_eyebrow_score')
-        highest_pts, lowest_pts = self._calculate_highest_and_lowest_eyebrow_point(results_by_expression, 'Enrugar testa', self.left_eyebrow_pts, self.right_eyebrow_pts)
-        # print('highest_pts', highest_pts)
-        # print('lowest_pts', lowest_pts)
+    def calculate_HB_eyebrow_score(self, geometry: FaceGeometry):
+        highest_pts = geometry.get('eyebrow_highest_x', 'Enrugar testa')
+        lowest_pts = geometry.get('eyebrow_lowest_x', 'Enrugar testa')
+        self.paralyzed_side = 'left' if highest_pts[0] > highest_pts[1] else 'right'
 
         paralyzed_side_highest_pt = highest_pts[0 if self.paralyzed_side == 'left' else 1]
         normal_side_highest_pt = highest_pts[1 if self.paralyzed_side == 'left' else 0]
-        paralyzed_side_lowest_pt = lowest_pts[0 if self.paralyzed_side == 'left' else 1]
         normal_side_lowest_pt = lowest_pts[1 if self.paralyzed_side == 'left' else 0]
-        # print('self.paralyzed_side', self.paralyzed_side)
-        # print('paralyzed_side_highest_pt', paralyzed_side_highest_pt)
-        # print('normal_side_highest_pt', normal_side_highest_pt)
-        # print('paralyzed_side_lowest_pt', paralyzed_side_lowest_pt)
-        # print('normal_side_lowest_pt', normal_side_lowest_pt)
 
-        normal_eyebrow_range_distance = self._calculate_distance_pixels(normal_side_highest_pt, normal_side_lowest_pt, 'horizontal')
-        # print('normal_eyebrow_range_distance', normal_eyebrow_range_distance)
-        paralyzed_eyebrow_range_distance = self._calculate_distance_pixels(paralyzed_side_highest_pt, normal_side_lowest_pt, 'horizontal')
-        # print('paralyzed_eyebrow_range_distance', paralyzed_eyebrow_range_distance)
+        normal_eyebrow_range_distance = abs(normal_side_highest_pt - normal_side_lowest_pt)
+        paralyzed_eyebrow_range_distance = abs(paralyzed_side_highest_pt - normal_side_lowest_pt)
 
         return self._calculate_HB_proportion_score(normal_eyebrow_range_distance, paralyzed_eyebrow_range_distance)
 
@@ -294,17 +373,8 @@ class SessionService:
         # print('eyebrow_score', eyebrow_score)
         # return eyebrow_score
 
-    def calculate_HB_mouth_score(self, results_by_expression):
-        # print('\ncalculate_HB_mouth_score')
-
-        range_distances = self._calculate_distance_from_expression_pts(
-            results_by_expression,
-            ['Sorrir mostrando os dentes'],
-            [self.left_mouth_end_pt, self.mid_mouth_end_pt],
-            [self.right_mouth_end_pt, self.mid_mouth_end_pt],
-            'vertical'
-        )
-        # print('---> range_distances', range_distances)
+    def calculate_HB_mouth_score(self, geometry: FaceGeometry):
+        range_distances = geometry.get('mouth_end_to_mid_vertical', 'Sorrir mostrando os dentes')
         return self._calculate_HB_proportion_score(range_distances[0], range_distances[1])
 
 
@@ -389,27 +459,22 @@ class SessionService:
         else:
             return "Grau I (Normal)"
 
-    def get_sunnybrook_classif(self, results_by_expression, user):
-        rest_symmetry_score = self.calculate_SB_rest_symmetry_score(results_by_expression, user)
+    def get_sunnybrook_classif(self, geometry: FaceGeometry, user):
+        rest_symmetry_score = self.calculate_SB_rest_symmetry_score(geometry, user)
         print('\nrest_symmetry_score', rest_symmetry_score)
-        movement_symmetry_score = self.calculate_SB_movement_symmetry_score(results_by_expression)
+        movement_symmetry_score = self.calculate_SB_movement_symmetry_score(geometry)
         print('\nmovement_symmetry_score', movement_symmetry_score)
-        synkinesis_score = self.calculate_SB_synkinesis_score(results_by_expression)
+        synkinesis_score = self.calculate_SB_synkinesis_score(geometry)
         print('\nsynkinesis_score', synkinesis_score)
 
         # TODO: VALIDAR
         return movement_symmetry_score - rest_symmetry_score - synkinesis_score
 
-    def calculate_SB_rest_symmetry_score(self, results_by_expression, user):
+    def calculate_SB_rest_symmetry_score(self, geometry: FaceGeometry, user):
         if user.get('eyelid_surgery'):
             eye_score = 1
         else :
-            distances_eyes = self._calculate_distance_from_expression_pts(
-                results_by_expression,
-                ['Repouso'],
-                self.left_eye_open_pts,
-                self.right_eye_open_pts
-            )
+            distances_eyes = geometry.get('eye_open', 'Repouso')
             # print('distances_eyes', distances_eyes)
             paralyzed_side_distance_eyes = distances_eyes[0 if self.paralyzed_side == 'left' else 1]
             normal_side_distance_eyes = distances_eyes[1 if self.paralyzed_side == 'left' else 0]
@@ -426,13 +491,11 @@ class SessionService:
                 cheeks_score = 2
             else: cheeks_score = 1
 
-        distances_mouth = self._calculate_distance_mouth_variation(
-            results_by_expression,
-            ['Repouso'],
-            self.left_mouth_end_pt,
-            self.right_mouth_end_pt,
-            self.average_line_pt
-        )
+        mouth_end_distances = geometry.get('mouth_end_to_average_line', 'Repouso')
+        distances_mouth = [
+            mouth_end_distances[1 if self.paralyzed_side == 'left' else 0],
+            mouth_end_distances[0 if self.paralyzed_side == 'left' else 1],
+        ]
         # print('distances_mouth', distances_mouth)
         perc_variation_mouth = abs(distances_mouth[0] - distances_mouth[1]) / distances_mouth[0] * 100
         mouth_score = 1 if perc_variation_mouth > 20 else 0
@@ -440,20 +503,20 @@ class SessionService:
 
         return (eye_score + cheeks_score + mouth_score) * 5
 
-    def calculate_SB_movement_symmetry_score(self, results_by_expression):
-        forehead_wrinkle_score, _ = self._calculate_SB_forehead_wrinkle_score(results_by_expression, 'Enrugar testa')
+    def calculate_SB_movement_symmetry_score(self, geometry: FaceGeometry):
+        forehead_wrinkle_score, _ = self._calculate_SB_forehead_wrinkle_score(geometry, 'Enrugar testa')
         # print('forehead_wrinkle_score', forehead_wrinkle_score)
 
-        gentle_eye_closure_score, _ = self._calculate_SB_gentle_eye_closure_score(results_by_expression, 'Fechar os olhos sem apertar')
+        gentle_eye_closure_score, _ = self._calculate_SB_gentle_eye_closure_score(geometry, 'Fechar os olhos sem apertar')
         # print('gentle_eye_closure_score', gentle_eye_closure_score)
 
-        open_mouth_smile_score, _ = self._calculate_SB_open_mouth_smile_score(results_by_expression, 'Sorrir mostrando os dentes')
+        open_mouth_smile_score, _ = self._calculate_SB_open_mouth_smile_score(geometry, 'Sorrir mostrando os dentes')
         # print('open_mouth_smile_score', open_mouth_smile_score)
 
-        snarl_score = self._calculate_SB_snarl_score(results_by_expression)
+        snarl_score = self._calculate_SB_snarl_score(geometry)
         # print('snarl_score', snarl_score)
 
-        lip_pucker_score = self._calculate_SB_lip_pucker_score(results_by_expression)
+        lip_pucker_score = self._calculate_SB_lip_pucker_score(geometry)
         # print('lip_pucker_score', lip_pucker_score)
 
         self.sb_forehead_wrinkle_simetry = self.calculate_SB_movement_simetry_score(forehead_wrinkle_score)
@@ -512,32 +575,32 @@ class SessionService:
         else:
             return 3
 
-    def calculate_SB_synkinesis_score(self, results_by_expression):
+    def calculate_SB_synkinesis_score(self, geometry: FaceGeometry):
         # ao enrugar testa analisar boca
-        _, open_mouth_smile_forehead_wrinkle_var = self._calculate_SB_open_mouth_smile_score(results_by_expression, 'Enrugar testa')
+        _, open_mouth_smile_forehead_wrinkle_var = self._calculate_SB_open_mouth_smile_score(geometry, 'Enrugar testa')
         # print('open_mouth_smile_forehead_wrinkle_var', open_mouth_smile_forehead_wrinkle_var)
         forehead_wrinkle_score = self.calculate_SB_synkinesis_percentage_score(open_mouth_smile_forehead_wrinkle_var)
         # print('->forehead_wrinkle_score', forehead_wrinkle_score)
         self.mouth_synkinesis_by_raising_eyebrows = True if open_mouth_smile_forehead_wrinkle_var > 20 else False
 
         # ao fechar os olhos, analisar testa e boca
-        _, eyebrows_eyes_closing_var = self._calculate_SB_forehead_wrinkle_score(results_by_expression,
+        _, eyebrows_eyes_closing_var = self._calculate_SB_forehead_wrinkle_score(geometry,
                                                                                  'Fechar os olhos sem apertar',
                                                                                  'Repouso')
         self.eyebrows_synkinesis_by_closing_eyes = True if eyebrows_eyes_closing_var > 20 else False
         # print('eyebrows_eyes_closing_var', eyebrows_eyes_closing_var)
-        _, open_mouth_smile_eyes_closure_var = self._calculate_SB_open_mouth_smile_score(results_by_expression, 'Fechar os olhos sem apertar')
+        _, open_mouth_smile_eyes_closure_var = self._calculate_SB_open_mouth_smile_score(geometry, 'Fechar os olhos sem apertar')
         self.mouth_synkinesis_by_closing_eyes = True if open_mouth_smile_eyes_closure_var > 20 else False
         # print('open_mouth_smile_eyes_closure_var', open_mouth_smile_eyes_closure_var)
         gentle_eye_closure_score = self.calculate_SB_synkinesis_percentage_score(max(eyebrows_eyes_closing_var, open_mouth_smile_eyes_closure_var))
         # print('->gentle_eye_closure_score', gentle_eye_closure_score)
 
         # ao sorrir, analisar testa e olhos
-        _, eyebrows_smile_var = self._calculate_SB_forehead_wrinkle_score(results_by_expression,
+        _, eyebrows_smile_var = self._calculate_SB_forehead_wrinkle_score(geometry,
                                                                           'Sorrir mostrando os dentes', 'Repouso')
         self.eyebrows_synkinesis_by_smiling = True if eyebrows_smile_var > 20 else False
         # print('eyebrows_smile_var', eyebrows_smile_var)
-        _, gentle_eye_closure_smile_var = self._calculate_SB_gentle_eye_closure_score(results_by_expression,
+        _, gentle_eye_closure_smile_var = self._calculate_SB_gentle_eye_closure_score(geometry,
                                                                                       'Sorrir mostrando os dentes',
                                                                                       'Repouso')
         self.eyes_synkinesis_by_smiling = True if gentle_eye_closure_smile_var > 20 else False
@@ -546,7 +609,7 @@ class SessionService:
         # print('->open_mouth_smile_score', open_mouth_smile_score)
 
         # ao elevar o labio superior, analisar olhos
-        _, gentle_eye_closure_snarl_var = self._calculate_SB_gentle_eye_closure_score(results_by_expression,
+        _, gentle_eye_closure_snarl_var = self._calculate_SB_gentle_eye_closure_score(geometry,
                                                                                       'Elevar o lábio superior',
                                                                                       'Repouso')
         self.eyes_synkinesis_by_snarl = True if gentle_eye_closure_snarl_var > 20 else False
@@ -555,11 +618,11 @@ class SessionService:
         # print('->snarl_score', snarl_score)
 
         # ao assobiar, analisar testa e olhos
-        _, eyebrows_lip_pucker_var = self._calculate_SB_forehead_wrinkle_score(results_by_expression, 'Assobiar',
+        _, eyebrows_lip_pucker_var = self._calculate_SB_forehead_wrinkle_score(geometry, 'Assobiar',
                                                                                'Repouso')
         self.eyebrows_synkinesis_by_lip_pucker = True if eyebrows_lip_pucker_var > 20 else False
         # print('eyebrows_lip_pucker_var', eyebrows_lip_pucker_var)
-        _, gentle_eye_closure_lip_pucker_var = self._calculate_SB_gentle_eye_closure_score(results_by_expression,
+        _, gentle_eye_closure_lip_pucker_var = self._calculate_SB_gentle_eye_closure_score(geometry,
                                                                                       'Assobiar',
                                                                                       'Repouso')
         self.eyes_synkinesis_by_lip_pucker = True if gentle_eye_closure_lip_pucker_var > 20 else False
@@ -575,195 +638,17 @@ class SessionService:
 
         return forehead_wrinkle_score + gentle_eye_closure_score + open_mouth_smile_score + snarl_score + lip_pucker_score
 
-    def _calculate_distance_between_expression_pts(self, results_by_expression, expressions, left_pt, right_pt, distance_type='euclidian'):
-        results = []
-        points_by_expression = []
-        filtered_items = [item for item in results_by_expression if any(key in expressions for key in item)]
-
-        for side in ['left', 'right']:
-            aux = []
-            for item in filtered_items:
-                for expression, data in item.items():
-                    # print(expression, self.get_px_pts_from_detection_result(
-                    #             [left_pt] if side == 'left' else [right_pt],
-                    #             mp.Image.create_from_file(data.get('file_path')),
-                    #             data.get('result')
-                    #         )[0])
-                    aux.append(
-                        next(iter(
-                            get_px_pts_from_detection_result(
-                                [left_pt] if side == 'left' else [right_pt],
-                                mp.Image.create_from_file(data.get('file_path')),
-                                data.get('result')
-                            )[0].values()
-                        ))
-                   )
-            points_by_expression.append(aux)
-
-        for expressions_coords in points_by_expression:
-            results.append(self._calculate_distance_pixels(expressions_coords[0], expressions_coords[1], distance_type))
-
-        return results
-
-    def _calculate_distance_from_expression_pts(self, results_by_expression, expressions, left_pts, right_pts, distance_type='euclidian'):
-        if len(expressions) != 1:
-            raise ValueError("Deve haver exatamente uma expressão para comparar.")
-
-        results = []
-        filtered_items = [item for item in results_by_expression if any(key in expressions for key in item)]
-
-        for side in ['left', 'right']:
-            for item in filtered_items:
-                for expression, data in item.items():
-                    expression_data = get_px_pts_from_detection_result(
-                                left_pts if side == 'left' else right_pts,
-                                mp.Image.create_from_file(data.get('file_path')),
-                                data.get('result')
-                            )
-                    # print(expression, next(iter(expression_data[0].values())), next(iter(expression_data[1].values())))
-                    distance = self._calculate_distance_pixels(next(iter(expression_data[0].values())), next(iter(expression_data[1].values())), distance_type)
-                    results.append(distance)
-
-        return results
-
-    def _calculate_distance_mouth_variation(self, results_by_expression, expressions, left_pt, right_pt, reference_pt):
-        if len(expressions) != 1:
-            raise ValueError("Deve haver exatamente uma expressão para comparar.")
-
-        filtered_items = [
-            item for item in results_by_expression
-            if any(key in expressions for key in item)
-        ]
-
-        def get_point_coordinates(point, item):
-            expression_data = next(iter(get_px_pts_from_detection_result(
-                [point],
-                mp.Image.create_from_file(item['file_path']),
-                item['result']
-            )[0].values()))
-            return expression_data
-
-        points = [
-            get_point_coordinates(pt, list(item.values())[0])
-            for pt in [left_pt, right_pt, reference_pt]
-            for item in filtered_items
-        ]
-
-        paralyzed_pt = points[0 if self.paralyzed_side == 'left' else 1]
-        normal_pt = points[1 if self.paralyzed_side == 'left' else 0]
-        ref_pt = points[2]
-
-        normal_distance = self._calculate_distance_pixels(normal_pt, ref_pt)
-        paralyzed_distance = self._calculate_distance_pixels(paralyzed_pt, ref_pt)
-
-        return [normal_distance, paralyzed_distance]
-
-    def _calculate_higher_variation_point(self, results_by_expression, expressions, left_pts, right_pts):
-        if len(expressions) != 2:
-            raise ValueError("Deve haver exatamente duas expressões para comparar.")
-
-        results = {}
-
-        for side in ['left', 'right']:
-            points_by_expression = [
-                {
-                    expression: get_px_pts_from_detection_result(
-                        left_pts if side == 'left' else right_pts,
-                        mp.Image.create_from_file(data.get('file_path')),
-                        data.get('result')
-                    )
-                    for expression, data in item.items()
-                }
-                for item in [item for item in results_by_expression if any(key in expressions for key in item)]
-            ]
-
-            try:
-                expression_1_points = next(iter(points_by_expression[0].values()))
-                expression_2_points = next(iter(points_by_expression[1].values()))
-            except (IndexError, KeyError) as e:
-                raise ValueError(f"Dados insuficientes para {expressions}") from e
-
-            max_point, max_distance = None, 0
-            for points_1, points_2 in zip(expression_1_points, expression_2_points):
-                (key1, coord1), (key2, coord2) = list(points_1.items())[0], list(points_2.items())[0]
-
-                if key1 == key2:
-                    distance = self._calculate_distance_pixels(coord1, coord2, 'horizontal')
-                    if distance > max_distance:
-                        max_distance = distance
-                        max_point = key1
-
-            results[side] = {'max_point': max_point, 'max_distance': max_distance}
-
-        return results
-
-    def lowest_or_highest_coord(self, data: List[Dict[int, Tuple[int, int]]], axis: str, type: Literal["highest", "lowest"]) -> Tuple[int, int]:
-        if axis not in ('x', 'y'):
-            raise ValueError("O parâmetro 'eixo' deve ser 'x' ou 'y'")
-
-        idx = 0 if axis == 'x' else 1
-        if type == 'highest':
-            return max((coord for item in data for coord in item.values()), key=lambda c: c[idx])
-        return min((coord for item in data for coord in item.values()), key=lambda c: c[idx])
-
-    def _calculate_highest_and_lowest_eyebrow_point(self, results_by_expression, expression, left_pts, right_pts):
-        results_highest = []
-        results_lowest = []
-        filtered_items = [item for item in results_by_expression if any(key in [expression] for key in item)]
-
-        for side in ['left', 'right']:
-            for item in filtered_items:
-                for expression, data in item.items():
-                    # print('->', self.lowest_or_highest_coord(self.get_px_pts_from_detection_result(
-                    #     left_pts if side == 'left' else right_pts,
-                    #     mp.Image.create_from_file(data.get('file_path')),
-                    #     data.get('result')
-                    # ), 'x', 'lowest'))
-                    results_highest.append(self.lowest_or_highest_coord(get_px_pts_from_detection_result(
-                        left_pts if side == 'left' else right_pts,
-                        mp.Image.create_from_file(data.get('file_path')),
-                        data.get('result')
-                    ), 'x', 'lowest'))
-                    results_lowest.append(self.lowest_or_highest_coord(get_px_pts_from_detection_result(
-                        left_pts if side == 'left' else right_pts,
-                        mp.Image.create_from_file(data.get('file_path')),
-                        data.get('result')
-                    ), 'x', 'highest'))
-
-        self.paralyzed_side = 'left' if results_highest[0][0] > results_highest[1][0] else 'right'
-
-        return results_highest, results_lowest
-
     # exp2 qd existir deve ser 'Repouso'
-    def _calculate_SB_forehead_wrinkle_score(self, results_by_expression, expression1, expression2=None, teste=''):
+    def _calculate_SB_forehead_wrinkle_score(self, geometry: FaceGeometry, expression1, expression2=None, teste=''):
         if teste: print('-------------------------', expression1, expression2)
+        distances_expression1 = geometry.get('eyebrow_mid_to_forehead_horizontal', expression1)
+        paralyzed_side_distance = distances_expression1[0 if self.paralyzed_side == 'left' else 1]
         if expression2:
-            eyebrows_mid_pts_expression1 = self._get_eyebrow_mid_pt(results_by_expression, expression1)  # rest
-            eyebrows_mid_pts_expression2 = self._get_eyebrow_mid_pt(results_by_expression, expression2)  # eyes closing
-            forehead_mid_pt1 = self._get_px_pts_by_expression(results_by_expression, expression1, [self.mid_forhead_pt])[0]
-            forehead_mid_pt2 = self._get_px_pts_by_expression(results_by_expression, expression2, [self.mid_forhead_pt])[0]
-            # print('1a', eyebrows_mid_pts_expression1)
-            # print('1b', eyebrows_mid_pts_expression2)
-            # print('self.paralyzed_side', self.paralyzed_side)
-            # print('forehead_mid_pt1', forehead_mid_pt1)
-            # print('forehead_mid_pt2', forehead_mid_pt2)
-            paralyzed_pt = eyebrows_mid_pts_expression1[0] if self.paralyzed_side == 'left' else eyebrows_mid_pts_expression1[1]
-            normal_pt = eyebrows_mid_pts_expression2[0] if self.paralyzed_side == 'left' else eyebrows_mid_pts_expression2[1]
-            normal_side_distance = self._calculate_distance_pixels(normal_pt, forehead_mid_pt2, 'horizontal')
-            paralyzed_side_distance = self._calculate_distance_pixels(paralyzed_pt, forehead_mid_pt1, 'horizontal')
+            distances_expression2 = geometry.get('eyebrow_mid_to_forehead_horizontal', expression2)
+            normal_side_distance = distances_expression2[0 if self.paralyzed_side == 'left' else 1]
         else:
-            eyebrows_mid_pts_expression1 = self._get_eyebrow_mid_pt(results_by_expression, expression1)
-            # print('2a eyebrows_mid_pts_expression1', eyebrows_mid_pts_expression1)
-            # print('self.paralyzed_side', self.paralyzed_side)
-            paralyzed_pt = eyebrows_mid_pts_expression1[0] if self.paralyzed_side == 'left' else eyebrows_mid_pts_expression1[1]
-            normal_pt = eyebrows_mid_pts_expression1[1] if self.paralyzed_side == 'left' else eyebrows_mid_pts_expression1[0]
-            forehead_mid_pt = self._get_px_pts_by_expression(results_by_expression, expression1, [self.mid_forhead_pt])[0]
-            normal_side_distance = self._calculate_distance_pixels(normal_pt, forehead_mid_pt, 'horizontal')
-            paralyzed_side_distance = self._calculate_distance_pixels(paralyzed_pt, forehead_mid_pt, 'horizontal')
-            # print('forehead_mid_pt', forehead_mid_pt)
-
-        # print('normal_pt', normal_pt)
-        # print('paralyzed_pt', paralyzed_pt)
+            normal_side_distance = distances_expression1[1 if self.paralyzed_side == 'left' else 0]
+
         # print('normal_side_distance', normal_side_distance)
         # print('paralyzed_side_distance', paralyzed_side_distance)
         # perc_variation = (abs(normal_pt - paralyzed_pt) / normal_pt) * 100
@@ -772,28 +657,16 @@ class SessionService:
         return self.calculate_SB_movement_percentage_score(perc_variation), perc_variation
 
     # exp2 qd existir deve ser 'Repouso'
-    def _calculate_SB_gentle_eye_closure_score(self, results_by_expression, expression1, expression2=None, teste=''):
+    def _calculate_SB_gentle_eye_closure_score(self, geometry: FaceGeometry, expression1, expression2=None, teste=''):
         if teste: print('-------------------------', expression1, expression2)
-        distances_eyes_expression1 = self._calculate_distance_from_expression_pts(
-            results_by_expression,
-            [expression1],
-            self.left_eye_open_pts,
-            self.right_eye_open_pts,
-            'horizontal'
-        )
+        distances_eyes_expression1 = geometry.get('eye_open_horizontal', expression1)
         # print('distances_eyes_expression1', distances_eyes_expression1)
 
         paralyzed_side_distance_eyes = distances_eyes_expression1[0 if self.paralyzed_side == 'left' else 1]
         normal_side_distance_eyes = distances_eyes_expression1[1 if self.paralyzed_side == 'left' else 0]
 
         if expression2:
-            distances_eyes_expression2 = self._calculate_distance_from_expression_pts(
-                results_by_expression,
-                [expression2],
-                self.left_eye_open_pts,
-                self.right_eye_open_pts,
-                'horizontal'
-            )
+            distances_eyes_expression2 = geometry.get('eye_open_horizontal', expression2)
             # print('distances_eyes_expression2', distances_eyes_expression2)
             normal_side_distance_eyes = distances_eyes_expression2[0 if self.paralyzed_side == 'left' else 1]
 
@@ -805,15 +678,9 @@ class SessionService:
         # print('perc_variation_eyes perc_variation', perc_variation_eyes)
         return self.calculate_SB_movement_percentage_score(perc_variation_eyes), perc_variation_eyes
 
-    def _calculate_SB_open_mouth_smile_score(self, results_by_expression, expression, teste=''):
+    def _calculate_SB_open_mouth_smile_score(self, geometry: FaceGeometry, expression, teste=''):
         if teste: print('-------------------------', expression)
-        distances_mouth = self._calculate_distance_between_expression_pts(
-            results_by_expression,
-            ['Repouso', expression],
-            self.left_mouth_end_pt,
-            self.right_mouth_end_pt,
-            'vertical'
-        )
+        distances_mouth = geometry.variation('mouth_end_y', 'Repouso', expression)
         paralyzed_side_distance_mouth = distances_mouth[0 if self.paralyzed_side == 'left' else 1]
         normal_side_distance_mouth = distances_mouth[1 if self.paralyzed_side == 'left' else 0]
         # perc_variation = abs(
@@ -826,15 +693,9 @@ class SessionService:
         # print('-------------------------')
         return self.calculate_SB_movement_percentage_score(perc_variation), perc_variation
 
-    def _calculate_SB_snarl_score(self, results_by_expression, teste=''):
+    def _calculate_SB_snarl_score(self, geometry: FaceGeometry, teste=''):
         if teste: print('-------------------------', teste)
-        distances = self._calculate_distance_between_expression_pts(
-            results_by_expression,
-            ['Repouso', 'Elevar o lábio superior'],
-            self.alar_base_pts[1],
-            self.alar_base_pts[0],
-            'vertical'
-        )
+        distances = geometry.variation('alar_base_y', 'Repouso', 'Elevar o lábio superior')
         paralyzed_side_distance = distances[0 if self.paralyzed_side == 'left' else 1]
         normal_side_distance = distances[1 if self.paralyzed_side == 'left' else 0]
         # print('distances', distances)
@@ -848,26 +709,9 @@ class SessionService:
 
         return self.calculate_SB_movement_percentage_score(perc_variation)
 
-    def _calculate_SB_lip_pucker_score(self, results_by_expression, teste=''):
+    def _calculate_SB_lip_pucker_score(self, geometry: FaceGeometry, teste=''):
         if teste: print('-------------------------', teste)
-        distances_rest = self._calculate_distance_from_expression_pts(
-            results_by_expression,
-            ['Repouso'],
-            self.left_mouth_lip_p_pts,
-            self.right_mouth_lip_p_pts,
-        )
-        # print('distances_rest', distances_rest)
-
-        distances_lip_pucker = self._calculate_distance_from_expression_pts(
-            results_by_expression,
-            ['Assobiar'],
-            self.left_mouth_lip_p_pts,
-            self.right_mouth_lip_p_pts,
-        )
-        # print('distances_lip_pucker', distances_lip_pucker)
-
-        excursion_left = abs(distances_rest[0] - distances_lip_pucker[0])
-        excursion_right = abs(distances_rest[1] - distances_lip_pucker[1])
+        excursion_left, excursion_right = geometry.variation('lip_pucker_width', 'Repouso', 'Assobiar')
         # print('excursion_left', excursion_left)
         # print('excursion_right', excursion_right)
 
@@ -885,75 +729,76 @@ class SessionService:
 
         return self.calculate_SB_movement_percentage_score(perc_variation)
 
-    def _calculate_mid_point(self, pts):
-        total_pts = len(pts)
-        sum_x = 0
-        sum_y = 0
-
-        for pt in pts:
-            _, (x, y) = next(iter(pt.items()))
-            sum_x += x
-            sum_y += y
-
-        return (int(sum_x / total_pts), int(sum_y / total_pts))
-
-    def _get_eyebrow_mid_pt(self, results_by_expression, exp):
-        results = []
-        right_eyebrow_pts = self.right_eyebrow_pts[:5]
-        left_eyebrow_pts = self.left_eyebrow_pts[:5]
-        filtered_items = [item for item in results_by_expression if any(key in exp for key in item)]
-
-        for side in ['left', 'right']:
-            for item in filtered_items:
-                for expression, data in item.items():
-                    expression_data = get_px_pts_from_detection_result(
-                                left_eyebrow_pts if side == 'left' else right_eyebrow_pts,
-                                mp.Image.create_from_file(data.get('file_path')),
-                                data.get('result')
-                            )
-                    results.append(self._calculate_mid_point(expression_data))
-        return results
-
-    def _get_px_pts_by_expression(self, results_by_expression, exp, pts):
-        results = []
-        filtered_items = [item for item in results_by_expression if any(key in exp for key in item)]
-
-        for item in filtered_items:
-            for expression, data in item.items():
-                expression_data = get_px_pts_from_detection_result(
-                            pts,
-                            mp.Image.create_from_file(data.get('file_path')),
-                            data.get('result')
-                        )
-                results.append(next(iter(expression_data[0].values())))
-        return results
-
-    def _calculate_distance_pixels(self, pt1, pt2, type: Literal["euclidian", "horizontal", "vertical"] = "euclidian") -> float:
-        x1, y1 = pt1
-        x2, y2 = pt2
-
-        if type == "horizontal":
-            return abs(x2 - x1)
-        elif type == "vertical":
-            return abs(y2 - y1)
-        elif type == "euclidian":
-            return math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-        else:
-            raise ValueError("Invalid distance type")
 
-    def file_to_base64(self, file_path, compression_level=None):
+class AsyncSessionService:
+    """The queries of SessionService used by the route handlers, on an aiomysql connection.
+
+    Processing and scoring stay in SessionService, which runs off the event loop.
+    """
+
+    def __init__(self, db_connection):
+        self.connection = db_connection
+
+    async def new_session(self, user_id: int):
         try:
-            if compression_level is not None:
-                with Image.open(file_path) as img:
-                    output = io.BytesIO()
-                    img.save(output, format=img.format, quality=compression_level)
-                    output.seek(0)
-                    return base64.b64encode(output.read()).decode("utf-8")
-            else:
-                with open(file_path, "rb") as file:
-                    return base64.b64encode(file.read()).decode("utf-8")
-        except FileNotFoundError:
-            return None
+            async with self.connection.cursor() as cursor:
+                await cursor.execute(NEW_SESSION_QUERY, (user_id,))
+                await self.connection.commit()
+                return {
+                    "session_id": cursor.lastrowid
+                }
         except Exception as e:
-            print(f"Erro: {e}")
-            return None
\ No newline at end of file
+            await self.connection.rollback()
+            raise e
+
+    async def get_sessions(self, user_id: int, after_session_id: Optional[int] = None, limit: int = 20, with_photos: bool = False) -> List[SessionResult]:
+        """The page of session ids is always read; only the results missing from the cache are loaded."""
+        cache = get_result_cache()
+        async with self.connection.cursor(DictCursor) as cursor:
+            await cursor.execute(*session_ids_query(user_id, after_session_id, limit))
+            session_ids = [row['session_id'] for row in await cursor.fetchall()]
+            if not session_ids:
+                return []
+
+            results = await cache.aget_many(user_id, session_ids)
+            missing = [session_id for session_id in session_ids if session_id not in results]
+            if missing:
+                generations = await cache.agenerations(user_id, missing)
+                await cursor.execute(*sessions_query(missing))
+                loaded = [SessionResult(**row, photos=[]) for row in await cursor.fetchall()]
+                await cache.aput_many(user_id, loaded, generations)
+                results.update((result.session_id, result) for result in loaded)
+
+            photos = []
+            if with_photos:
+                await cursor.execute(*sessions_photos_query(session_ids))
+                photos = await cursor.fetchall()
+        return session_results(session_ids, results, photos)
+
+    async def get_session_images(self, session_id: int):
+        async with self.connection.cursor(DictCursor) as cursor:
+            await cursor.execute(GET_SESSION_IMAGES_QUERY, (session_id,))
+            return await cursor.fetchall()
+
+    async def get_session(self, session_id: int, user_id: int):
+        async with self.connection.cursor(DictCursor) as cursor:
+            await cursor.execute(GET_SESSION_QUERY, (session_id, user_id))
+            return await cursor.fetchone()
+
+    async def get_session_result(self, session_id: int, user_id: int):
+        cache = get_result_cache()
+        result = (await cache.aget_many(user_id, [session_id])).get(session_id)
+        if result is None:
+            generations = await cache.agenerations(user_id, [session_id])
+            async with self.connection.cursor(DictCursor) as cursor:
+                await cursor.execute(GET_SESSION_RESULT_QUERY, (session_id,))
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+
+            row.pop('result_id')
+            result = SessionResult(**row, photos=[])
+            await cache.aput_many(user_id, [result], generations)
+
+        images = await self.get_session_images(session_id)
+        return result.model_copy(update={'photos': await run_blocking(encode_session_images, images)})
@@ -0,0 +1,32 @@
+import os
+
+# settings without defaults; nothing in the tests talks to MySQL
+os.environ.setdefault("DATABASE_URL", "mysql://test")
+os.environ.setdefault("database_host", "localhost")
+os.environ.setdefault("database_port", "3306")
+os.environ.setdefault("database_name", "test")
+os.environ.setdefault("database_user", "test")
+os.environ.setdefault("database_password", "test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("FACE_LANDMARKER_MODEL_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                                                 "face_landmarker_v2_with_blendshapes.task"))
+
+import pytest
+
+from app.core import storage
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app", "services", "image.jpg")
+
+
+@pytest.fixture
+def sample_image_bytes() -> bytes:
+    with open(SAMPLE_IMAGE, "rb") as file:
+        return file.read()
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    local = storage.LocalStorage(str(tmp_path / "assets"))
+    monkeypatch.setattr(storage, "_storage", local)
+    return local
@@ -0,0 +1,12 @@
+import datetime
+
+from app.db.models.Session import SessionResult
+
+
+def make_result(session_id: int, house_brackmann: str = "II", **values):
+    scores = {field: 0 for field, info in SessionResult.model_fields.items() if info.annotation is int}
+    flags = {field: False for field, info in SessionResult.model_fields.items() if info.annotation is bool}
+    return SessionResult(**{
+        **scores, **flags, "session_id": session_id, "house_brackmann": house_brackmann,
+        "processed_at": datetime.datetime(2024, 1, 1), "photos": [], **values,
+    })
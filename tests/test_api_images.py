@@ -0,0 +1,151 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api import deps, images
+from app.api.images import _etag_matches, _parse_range
+from app.core.security import verify_token
+from app.main import app
+
+
+class FakePool:
+    def __init__(self):
+        self.in_use = 0
+        self.checkouts = 0
+
+    @asynccontextmanager
+    async def connection(self):
+        self.in_use += 1
+        self.checkouts += 1
+        try:
+            yield object()
+        finally:
+            self.in_use -= 1
+
+
+class FakeImagesService:
+    inserted = []
+
+    def __init__(self, db):
+        self.db = db
+
+    async def user_owns_image(self, photo_id, user_id):
+        return True
+
+    async def find_uploaded_image(self, session_id, facial_expression, content_hash):
+        return None
+
+    async def insert_images_db(self, photo_id, session_id, url, facial_expression, processed, content_hash):
+        self.inserted.append((photo_id, facial_expression))
+
+    async def insert_images_db_many(self, rows):
+        self.inserted.extend((row[0], row[3]) for row in rows)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = FakePool()
+
+    async def get_async_pool():
+        return pool
+
+    monkeypatch.setattr(deps, "get_async_pool", get_async_pool)
+    monkeypatch.setattr(images, "AsyncImagesService", FakeImagesService)
+    FakeImagesService.inserted = []
+    return pool
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[verify_token] = lambda: {"id": 1}
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def connections_during_processing(pool, monkeypatch):
+    seen = []
+
+    async def run_cpu_bound(func, image_bytes):
+        seen.append(pool.in_use)
+        return {"image": f"photo-{len(seen)}"}
+
+    monkeypatch.setattr(images, "run_cpu_bound", run_cpu_bound)
+    return seen
+
+
+def test_upload_releases_the_connection_while_processing(client, pool, connections_during_processing):
+    response = client.post("/images/upload", files={"file": ("a.jpg", b"jpeg")},
+                           data={"facial_expression": "rest", "session_id": "1"})
+
+    assert response.status_code == 200
+    assert connections_during_processing == [0]
+    assert FakeImagesService.inserted == [("photo-1", "rest")]
+    assert pool.in_use == 0
+
+
+def test_upload_session_releases_the_connection_while_processing(client, pool, connections_during_processing):
+    response = client.post("/images/upload-session", data={"session_id": "1"},
+                           files=[("rest", ("rest.jpg", b"rest")), ("smile", ("smile.jpg", b"smile"))])
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == ["created", "created"]
+    assert connections_during_processing == [0, 0]
+    assert sorted(FakeImagesService.inserted) == [("photo-1", "rest"), ("photo-2", "smile")]
+    assert pool.in_use == 0
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=50-10"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(HTTPException) as error:
+        _parse_range(header, 1000)
+
+    assert error.value.status_code == 416
+    assert error.value.headers == {"content-range": "bytes */1000"}
+
+
+@pytest.mark.parametrize("header, matches", [('"a"', True), ('W/"a", "b"', True), ("*", True), ('"b"', False)])
+def test_etag_matches(header, matches):
+    assert _etag_matches(header, '"a"') is matches
+
+
+PHOTO_ID = "3f2b6c1e-0000-4000-8000-000000000000"
+
+
+def test_get_image_serves_ranges_and_revalidation(client, pool, local_storage):
+    content = bytes(range(256)) * 4
+    local_storage.write(f"{PHOTO_ID}.jpg", content)
+
+    response = client.get(f"/images/{PHOTO_ID}")
+    assert response.status_code == 200
+    assert response.content == content
+    etag = response.headers["etag"]
+
+    response = client.get(f"/images/{PHOTO_ID}", headers={"range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+
+    response = client.get(f"/images/{PHOTO_ID}", headers={"range": "bytes=10-19", "if-range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == content
+
+    assert client.get(f"/images/{PHOTO_ID}", headers={"if-none-match": etag}).status_code == 304
+    assert client.get("/images/not-a-uuid").status_code == 404
+    assert pool.in_use == 0
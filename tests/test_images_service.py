@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import images_service
+from app.services.images_service import classify_upload
+from app.services.landmarks import ExpressionLandmarks
+
+
+@pytest.fixture
+def detections(monkeypatch):
+    calls = []
+    detect = images_service.detect_face_landmarks
+
+    def counting_detect(image):
+        calls.append(image)
+        return detect(image)
+
+    monkeypatch.setattr(images_service, "detect_face_landmarks", counting_detect)
+    return calls
+
+
+def _rotated(image_bytes: bytes, rotation) -> bytes:
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if rotation is not None:
+        image = cv2.rotate(image, rotation)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+@pytest.mark.parametrize("rotation", [None, cv2.ROTATE_90_CLOCKWISE, cv2.ROTATE_90_COUNTERCLOCKWISE, cv2.ROTATE_180])
+def test_upload_reuses_the_first_detection(local_storage, sample_image_bytes, detections, rotation):
+    result = classify_upload(_rotated(sample_image_bytes, rotation))
+
+    assert len(detections) == 1
+    assert local_storage.exists(f"{result['image']}.npz")
+
+
+def _tilted(image_bytes: bytes, angle: float) -> bytes:
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.imencode(".jpg", cv2.warpAffine(image, matrix, (width, height)))[1].tobytes()
+
+
+@pytest.mark.parametrize("angle, detection_count", [(10, 1), (-10, 1), (30, 2), (-30, 2)])
+def test_a_tilted_face_is_detected_again_once_leveled(local_storage, sample_image_bytes, detections, angle,
+                                                      detection_count):
+    result = classify_upload(_tilted(sample_image_bytes, angle))
+    landmarks = ExpressionLandmarks.from_bytes(local_storage.read(f"{result['image']}.npz"))
+
+    assert len(detections) == detection_count
+    # the second detection runs on the leveled crop, whose eyes are level
+    eyes = landmarks.points[[263, 33], :2]
+    assert abs(eyes[0][1] - eyes[1][1]) < 0.05 * abs(eyes[0][0] - eyes[1][0])
+
+
+@pytest.mark.parametrize("angle, residual", [(-179.5, 0.5), (93.5, 3.5), (-89.5, 0.5), (178.7, -1.3), (30, 30), (60, -30)])
+def test_residual_rotation_ignores_right_angles(angle, residual):
+    assert images_service._residual_rotation(angle) == pytest.approx(residual)
+
+
+def _stored_photo(storage, photo_id):
+    image = cv2.imdecode(np.frombuffer(storage.read(f"{photo_id}.jpg"), np.uint8), cv2.IMREAD_COLOR)
+    return image, ExpressionLandmarks.from_bytes(storage.read(f"{photo_id}.npz"))
+
+
+def test_large_upload_is_stored_at_its_own_resolution(local_storage, sample_image_bytes, monkeypatch):
+    full_image, full_landmarks = _stored_photo(local_storage, classify_upload(sample_image_bytes)["image"])
+
+    # the 800x450 sample is detected on a 400x225 working copy
+    monkeypatch.setattr(settings, "MAX_WORKING_RESOLUTION", 400)
+    image, landmarks = _stored_photo(local_storage, classify_upload(sample_image_bytes)["image"])
+
+    assert image.shape == (landmarks.height, landmarks.width, 3)
+    assert image.shape[:2] == pytest.approx(full_image.shape[:2], rel=0.02)
+    assert np.abs(landmarks.normalized() - full_landmarks.normalized())[:, :2].max() < 0.02
+
+
+def test_oversized_upload_is_never_decoded_at_full_resolution(local_storage, sample_image_bytes, monkeypatch):
+    full_image, full_landmarks = _stored_photo(local_storage, classify_upload(sample_image_bytes)["image"])
+    sample = cv2.imdecode(np.frombuffer(sample_image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    oversized = cv2.imencode(".jpg", cv2.resize(sample, (3200, 1800), interpolation=cv2.INTER_CUBIC))[1].tobytes()
+
+    decoded = []
+    imdecode = cv2.imdecode
+
+    def recording_imdecode(buffer, flags):
+        image = imdecode(buffer, flags)
+        decoded.append(image.shape[:2])
+        return image
+
+    monkeypatch.setattr(cv2, "imdecode", recording_imdecode)
+    monkeypatch.setattr(settings, "MAX_WORKING_RESOLUTION", 400)
+    monkeypatch.setattr(settings, "MAX_STORED_RESOLUTION", 800)
+    image, landmarks = _stored_photo(local_storage, classify_upload(oversized)["image"])
+
+    # the working copy is decoded at 1/8 size and the stored one at 1/4
+    assert decoded[:2] == [(225, 400), (450, 800)]
+    assert image.shape == (landmarks.height, landmarks.width, 3)
+    assert max(image.shape[:2]) <= 800
+    assert image.shape[:2] == pytest.approx(full_image.shape[:2], rel=0.02)
+    assert np.abs(landmarks.normalized() - full_landmarks.normalized())[:, :2].max() < 0.02
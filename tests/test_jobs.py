@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+
+import pytest
+
+from app.services import jobs
+from app.services.jobs import SessionJobQueue
+
+
+class FakeSessionService:
+    sessions = {}
+    fail_with = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get_session(self, session_id, user_id):
+        session = self.sessions.get(session_id)
+        if session is None or session["user_id"] != user_id:
+            return None
+        return {"session_id": session_id, "status": session["status"], "error": session["error"]}
+
+    def set_session_status(self, session_id, status, error=None):
+        self.sessions[session_id].update(status=status, error=error)
+
+    def process_session(self, user, session_id):
+        assert self.sessions[session_id]["status"] == "pending"
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.set_session_status(session_id, "processed")
+
+
+class FakePool:
+    @contextmanager
+    def connection(self):
+        yield object()
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setattr(jobs, "get_pool", FakePool)
+    monkeypatch.setattr(jobs, "SessionService", FakeSessionService)
+    FakeSessionService.sessions = {1: {"user_id": 7, "status": "completed", "error": "falha anterior"}}
+    FakeSessionService.fail_with = None
+    queue = SessionJobQueue(max_workers=1)
+    yield queue
+    queue.shutdown()
+
+
+def test_job_processes_the_session(queue):
+    assert queue.submit({"id": 7}, 1).status == "pending"
+    queue.shutdown()
+
+    assert FakeSessionService.sessions[1] == {"user_id": 7, "status": "processed", "error": None}
+    assert queue.stats() == {"running": 0, "failed": 0}
+
+
+@pytest.mark.parametrize("previous_status", ["created", "completed", "processed"])
+def test_failed_job_restores_the_previous_status_and_stores_the_error(queue, previous_status):
+    FakeSessionService.sessions[1]["status"] = previous_status
+    FakeSessionService.fail_with = ValueError("Nenhum rosto encontrado.")
+
+    queue.submit({"id": 7}, 1)
+    queue.shutdown()
+
+    assert FakeSessionService.sessions[1]["status"] == previous_status
+    assert FakeSessionService.sessions[1]["error"] == "Nenhum rosto encontrado."
+    assert queue.stats() == {"running": 0, "failed": 1}
+
+
+def test_submit_rejects_a_session_of_another_user(queue):
+    with pytest.raises(ValueError):
+        queue.submit({"id": 8}, 1)
+
+    assert FakeSessionService.sessions[1]["status"] == "completed"
+    assert queue.stats()["running"] == 0
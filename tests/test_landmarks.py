@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services.images_service import warp_image
+from app.services.landmarks import ExpressionLandmarks, apply_transform, rotate_90_transform, rotated_size, \
+    rotation_transform, scale_transform, translation_transform
+
+POINT = (37, 21)
+
+
+def _marked_image(width: int, height: int) -> Image.Image:
+    pixels = np.zeros((height, width), dtype=np.uint8)
+    pixels[POINT[1], POINT[0]] = 255
+    return Image.fromarray(pixels)
+
+
+def _brightest(image: np.ndarray) -> tuple:
+    y, x = np.unravel_index(np.argmax(image), image.shape)
+    return x, y
+
+
+def _mapped(transform: np.ndarray) -> np.ndarray:
+    # pixel centers are at +0.5 in the landmarks' edge coordinates
+    center = np.array([[POINT[0] + 0.5, POINT[1] + 0.5, 0.0]])
+    return np.floor(apply_transform(center, transform)[0, :2])
+
+
+@pytest.mark.parametrize("angle", [-33.3, -7.5, 0.4, 12.0, 90.0, 171.2])
+@pytest.mark.parametrize("width, height", [(120, 80), (75, 131)])
+def test_rotation_matches_pil(angle, width, height):
+    rotated = _marked_image(width, height).rotate(angle, resample=Image.NEAREST, expand=True)
+
+    assert rotated.size == rotated_size(angle, width, height)
+    transform = rotation_transform(angle, width, height, *rotated.size)
+    assert np.abs(_mapped(transform) - _brightest(np.asarray(rotated))).max() <= 1
+
+
+@pytest.mark.parametrize("width, height", [(120, 80), (75, 131)])
+def test_rotate_90_matches_pil(width, height):
+    transposed = _marked_image(width, height).transpose(Image.ROTATE_90)
+
+    assert tuple(_mapped(rotate_90_transform(width))) == _brightest(np.asarray(transposed))
+
+
+def test_warp_image_moves_pixels_like_the_landmarks():
+    image = np.asarray(_marked_image(120, 80).convert("RGB"))
+    transform = translation_transform(-10, -5) @ rotation_transform(-12.0, 120, 80, *rotated_size(-12.0, 120, 80))
+
+    warped = warp_image(image, transform, 100, 90)
+
+    assert np.abs(_mapped(transform) - _brightest(warped[:, :, 0])).max() <= 1
+
+
+def test_transformed_keeps_the_path_to_the_upload():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 100, (478, 3))
+    upload = ExpressionLandmarks(points, 100, 100, source_transform=np.eye(3))
+    transform = translation_transform(-20, -10) @ rotation_transform(15.0, 100, 100, *rotated_size(15.0, 100, 100))
+
+    cropped = upload.transformed(transform, 60, 70).resized(120, 140)
+
+    assert (cropped.width, cropped.height) == (120, 140)
+    assert np.allclose(cropped.source_points()[:, :2], points[:, :2])
+    assert np.allclose(cropped.points[:, 2], points[:, 2] * 2)
+
+
+def test_landmarks_survive_serialisation():
+    landmarks = ExpressionLandmarks(np.arange(478 * 3, dtype=np.float64).reshape(478, 3), 640, 480,
+                                    {"eyeBlinkLeft": 0.25}, np.eye(4), scale_transform(0.5, 0.5))
+
+    restored = ExpressionLandmarks.from_bytes(landmarks.to_bytes())
+
+    assert np.array_equal(restored.points, landmarks.points)
+    assert (restored.width, restored.height) == (640, 480)
+    assert restored.blendshapes == {"eyeBlinkLeft": 0.25}
+    assert np.array_equal(restored.transformation_matrix, np.eye(4))
+    assert np.array_equal(restored.source_transform, scale_transform(0.5, 0.5))
@@ -0,0 +1,83 @@
+from app.db import migrate
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        self.connection.executed.append((query, params))
+
+    def executemany(self, query, rows):
+        for params in rows:
+            self.execute(query, params)
+
+    def fetchall(self):
+        return [(version,) for version in self.connection.applied]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, applied=()):
+        self.applied = set(applied)
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        for query, params in self.executed:
+            if query.startswith("INSERT INTO schema_migrations"):
+                self.applied.add(params[0])
+
+    def rollback(self):
+        pass
+
+
+def _statements(name: str):
+    migration = next(migration for migration in migrate.load_migrations() if migration.name == name)
+    with open(migration.path, encoding="utf-8") as file:
+        return migrate.split_statements(file.read())
+
+
+def test_migrations_are_numbered_in_order():
+    versions = [migration.version for migration in migrate.load_migrations()]
+
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_split_statements_drops_comments_and_empty_statements():
+    sql = "-- a comment; with a semicolon\nSELECT 1;\n\n-- another\nSELECT 2;\n"
+
+    assert migrate.split_statements(sql) == ["SELECT 1", "SELECT 2"]
+
+
+def test_content_hash_migration_only_alters_what_is_missing():
+    statements = _statements("photos_content_hash")
+
+    assert not any(statement.startswith("ALTER") for statement in statements)
+    checks = [statement for statement in statements if statement.startswith("SET @")]
+    assert len(checks) == 2
+    assert all("information_schema" in check for check in checks)
+    assert sum(statement.startswith("EXECUTE") for statement in statements) == 2
+
+
+def test_migrate_runs_only_the_pending_versions():
+    connection = FakeConnection(applied={1})
+
+    pending = migrate.migrate(connection, migrate.load_migrations())
+
+    assert [migration.version for migration in pending] == sorted(connection.applied - {1})
+    assert connection.applied == {migration.version for migration in migrate.load_migrations()}
+    assert migrate.migrate(connection, migrate.load_migrations()) == []
+
+
+def test_baseline_records_without_running():
+    connection = FakeConnection()
+
+    migrate.baseline(connection, migrate.load_migrations(), 2)
+
+    assert connection.applied == {1, 2}
+    assert not any(query.startswith(("CREATE TABLE users", "SET @")) for query, _ in connection.executed)
@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.multipart import iter_multipart
+
+BOUNDARY = "test-boundary"
+
+
+class FakeRequest:
+    def __init__(self, body: bytes, chunk_size: int, content_type: str = f"multipart/form-data; boundary={BOUNDARY}"):
+        self.headers = {"content-type": content_type}
+        self.body = body
+        self.chunk_size = chunk_size
+        self.sent = 0
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            self.sent = start + self.chunk_size
+            yield self.body[start:start + self.chunk_size]
+
+
+def _body(*parts) -> bytes:
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _collect(request):
+    async def collect():
+        return [(part, request.sent) async for part in iter_multipart(request)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_parts_are_parsed_and_hashed(chunk_size):
+    photo = bytes(range(256)) * 40 + b"\r\n--not-the-boundary\r\n"
+    request = FakeRequest(_body(("session_id", None, b"42"), ("rest", "rest.jpg", photo)), chunk_size)
+
+    parts = [part for part, _ in _collect(request)]
+
+    assert [(part.name, part.filename) for part in parts] == [("session_id", None), ("rest", "rest.jpg")]
+    assert parts[0].content == b"42"
+    assert parts[1].content == photo
+    assert parts[1].content_hash == hashlib.sha256(photo).hexdigest()
+
+
+def test_each_part_is_yielded_before_the_rest_of_the_body_arrives():
+    body = _body(("rest", "rest.jpg", b"a" * 1000), ("smile", "smile.jpg", b"b" * 1000))
+    request = FakeRequest(body, 100)
+
+    received = {part.name: sent for part, sent in _collect(request)}
+
+    assert received["rest"] < len(body) - 900
+    assert received["smile"] >= len(body)
+
+
+def test_other_content_types_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        _collect(FakeRequest(b"{}", 10, "application/json"))
+
+    assert error.value.status_code == 400
@@ -0,0 +1,50 @@
+import os
+
+import mediapipe as mp
+import numpy as np
+import pytest
+from mediapipe.framework.formats import landmark_pb2
+
+from app.services.landmarks import ExpressionLandmarks
+from app.services.overlay import render_overlay
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _draw_landmarks(image_rgb: np.ndarray, normalized: np.ndarray, detail: str) -> np.ndarray:
+    """MediaPipe's protobuf-based drawing, as the overlay was drawn before render_overlay."""
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    landmark_list.landmark.extend(landmark_pb2.NormalizedLandmark(x=x, y=y, z=z) for x, y, z in normalized)
+    face_mesh, styles = mp.solutions.face_mesh, mp.solutions.drawing_styles
+    layers = [
+        (face_mesh.FACEMESH_CONTOURS, styles.get_default_face_mesh_contours_style()),
+        (face_mesh.FACEMESH_IRISES, styles.get_default_face_mesh_iris_connections_style()),
+    ]
+    if detail == "full":
+        layers.insert(0, (face_mesh.FACEMESH_TESSELATION, styles.get_default_face_mesh_tesselation_style()))
+
+    annotated_image = np.copy(image_rgb)
+    for connections, style in layers:
+        mp.solutions.drawing_utils.draw_landmarks(image=annotated_image, landmark_list=landmark_list,
+                                                  connections=connections, landmark_drawing_spec=None,
+                                                  connection_drawing_spec=style)
+    return annotated_image
+
+
+@pytest.mark.parametrize("detail", ["full", "contours"])
+@pytest.mark.parametrize("width, height, shift", [(640, 480, 0.0), (333, 517, 0.0), (480, 640, 0.5)])
+def test_overlay_matches_mediapipe_drawing(detail, width, height, shift):
+    normalized = np.load(os.path.join(FIXTURES, "face_landmarks.npy")).astype(np.float32).astype(np.float64)
+    # shifted faces put some landmarks outside the image, whose edges are skipped
+    normalized[:, 0] += shift
+    image_rgb = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    landmarks = ExpressionLandmarks(normalized * [width, height, width], width, height)
+
+    assert np.array_equal(render_overlay(image_rgb, landmarks, detail), _draw_landmarks(image_rgb, normalized, detail))
+
+
+def test_overlay_rejects_an_unknown_detail():
+    landmarks = ExpressionLandmarks(np.zeros((478, 3)), 10, 10)
+
+    with pytest.raises(ValueError):
+        render_overlay(np.zeros((10, 10, 3), dtype=np.uint8), landmarks, "points")
@@ -0,0 +1,42 @@
+import os
+
+from app.services.overlay_cache import OverlayCache
+
+
+def test_get_returns_the_stored_bytes(tmp_path):
+    cache = OverlayCache(str(tmp_path), max_bytes=1024)
+
+    assert cache.get("photo", "full") is None
+    cache.put("photo", "full", b"jpeg")
+
+    assert cache.get("photo", "full") == b"jpeg"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_eviction_removes_the_least_recently_used(tmp_path):
+    cache = OverlayCache(str(tmp_path), max_bytes=250)
+    cache.put("a", "full", b"a" * 100)
+    cache.put("b", "full", b"b" * 100)
+    os.utime(tmp_path / "a.full.jpg", (1, 1))
+    os.utime(tmp_path / "b.full.jpg", (2, 2))
+
+    cache.put("c", "full", b"c" * 100)
+
+    assert cache.get("a", "full") is None
+    assert cache.get("b", "full") == b"b" * 100
+    assert cache.get("c", "full") == b"c" * 100
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bytes_read_before_an_eviction_stay_valid(tmp_path):
+    cache = OverlayCache(str(tmp_path), max_bytes=150)
+    cache.put("a", "full", b"a" * 100)
+    content = cache.get("a", "full")
+    os.utime(tmp_path / "a.full.jpg", (1, 1))
+
+    # evicts "a" while its response would still be in flight
+    cache.put("b", "full", b"b" * 100)
+
+    assert not os.path.exists(tmp_path / "a.full.jpg")
+    assert content == b"a" * 100
@@ -0,0 +1,127 @@
+import pytest
+
+from app.services import result_cache
+from app.services.result_cache import MemoryResultCache, NoResultCache, RedisResultCache, ResultCache
+
+from tests.factories import make_result
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        return MemoryResultCache(max_entries=100, ttl=60)
+    return RedisResultCache(fakeredis.FakeRedis(), ttl=60)
+
+
+def _read_through(cache: ResultCache, user_id, results):
+    generations = cache.generations(user_id, [result.session_id for result in results])
+    cache.put_many(user_id, results, generations)
+
+
+def test_base_cache_is_abstract():
+    with pytest.raises(TypeError):
+        ResultCache()
+
+
+def test_put_then_get(cache):
+    _read_through(cache, 1, [make_result(10, photos=["/images/a"]), make_result(11)])
+
+    found = cache.get_many(1, [10, 11, 12])
+
+    assert sorted(found) == [10, 11]
+    assert found[10].photos == []
+    assert cache.get_many(2, [10]) == {}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_invalidate_drops_the_result(cache):
+    _read_through(cache, 1, [make_result(10)])
+
+    cache.invalidate(10, 1)
+
+    assert cache.get_many(1, [10]) == {}
+
+
+def test_put_after_an_invalidation_is_skipped(cache):
+    generations = cache.generations(1, [10, 11])
+    stale = [make_result(10, house_brackmann="II"), make_result(11)]
+    # the session is reprocessed while the old result is being read
+    cache.invalidate(10, 1)
+    cache.put_many(1, stale, generations)
+
+    assert sorted(cache.get_many(1, [10, 11])) == [11]
+    assert cache.stats()["stale_puts"] == 1
+
+    _read_through(cache, 1, [make_result(10, house_brackmann="III")])
+    assert cache.get_many(1, [10])[10].house_brackmann == "III"
+
+
+def test_put_without_a_generation_is_ignored(cache):
+    cache.put_many(1, [make_result(10)], {})
+
+    assert cache.get_many(1, [10]) == {}
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryResultCache(max_entries=2, ttl=60)
+    _read_through(cache, 1, [make_result(1), make_result(2)])
+    cache.get_many(1, [1])
+
+    _read_through(cache, 1, [make_result(3)])
+
+    assert sorted(cache.get_many(1, [1, 2, 3])) == [1, 3]
+
+
+def test_memory_cache_expires_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = MemoryResultCache(max_entries=10, ttl=60)
+    _read_through(cache, 1, [make_result(1)])
+
+    now[0] += 59
+    assert 1 in cache.get_many(1, [1])
+    now[0] += 2
+    assert cache.get_many(1, [1]) == {}
+    assert cache.stats()["entries"] == 0
+
+
+def test_memory_cache_forgets_old_invalidations_safely():
+    cache = MemoryResultCache(max_entries=2, ttl=60)
+    generations = cache.generations(1, [1])
+    cache.invalidate(1, 1)
+    # pushes the invalidation of session 1 out of the bounded history
+    cache.invalidate(2, 1)
+    cache.invalidate(3, 1)
+
+    cache.put_many(1, [make_result(1)], generations)
+
+    assert cache.get_many(1, [1]) == {}
+
+
+def test_redis_cache_expires_with_the_ttl():
+    client = fakeredis.FakeRedis()
+    cache = RedisResultCache(client, ttl=60)
+    _read_through(cache, 1, [make_result(1)])
+
+    assert 0 < client.pttl(cache._key(1, 1)) <= 60000
+
+
+def test_redis_cache_sees_invalidations_of_other_workers():
+    server = fakeredis.FakeServer()
+    worker, other_worker = (RedisResultCache(fakeredis.FakeRedis(server=server), ttl=60) for _ in range(2))
+    generations = worker.generations(1, [1])
+
+    other_worker.invalidate(1, 1)
+    worker.put_many(1, [make_result(1)], generations)
+
+    assert other_worker.get_many(1, [1]) == {}
+
+
+def test_no_cache_never_hits():
+    cache = NoResultCache()
+    _read_through(cache, 1, [make_result(1)])
+
+    assert cache.get_many(1, [1]) == {}
@@ -0,0 +1,82 @@
+"""Scores of synthetic sessions against a reference computed by the scoring code from before the
+landmark matrix (003), the batched geometry (005) and the upload-time features (009).
+
+Each case perturbs one detected face with seeded noise per expression, on an image of random size;
+``fixtures/scoring_reference.json`` holds what the original per-point implementation returned for it.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.services.geometry import FaceGeometry, features_from_bytes, features_to_bytes, photo_features
+from app.services.landmarks import ExpressionLandmarks
+from app.services.sessions_service import SessionService
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+EXPRESSIONS = ['Repouso', 'Enrugar testa', 'Fechar os olhos sem apertar', 'Sorrir mostrando os dentes',
+               'Elevar o lábio superior', 'Assobiar']
+ATTRIBUTES = ['paralyzed_side', 'hb_eyes_simetry', 'hb_mouth_simetry', 'sb_forehead_wrinkle_simetry',
+              'sb_gentle_eye_closure_simetry', 'sb_smile_simetry', 'sb_snarl_simetry', 'sb_lip_pucker_simetry',
+              'synkinesis_eyebrows', 'synkinesis_eyes', 'synkinesis_mouth', 'mouth_synkinesis_by_raising_eyebrows',
+              'eyebrows_synkinesis_by_closing_eyes', 'mouth_synkinesis_by_closing_eyes',
+              'eyebrows_synkinesis_by_smiling', 'eyes_synkinesis_by_smiling', 'eyes_synkinesis_by_snarl',
+              'eyebrows_synkinesis_by_lip_pucker', 'eyes_synkinesis_by_lip_pucker']
+
+
+class _Landmark:
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class _DetectionResult:
+    def __init__(self, points: np.ndarray):
+        self.face_landmarks = [[_Landmark(*point) for point in points]]
+        self.face_blendshapes = []
+        self.facial_transformation_matrixes = []
+
+
+def _cases():
+    base = np.load(os.path.join(FIXTURES, "face_landmarks.npy"))
+    with open(os.path.join(FIXTURES, "scoring_reference.json"), encoding="utf-8") as file:
+        reference = json.load(file)
+
+    for seed, expected in enumerate(reference):
+        rng = np.random.default_rng(seed)
+        width, height = int(rng.integers(300, 900)), int(rng.integers(300, 900))
+        expressions = list(EXPRESSIONS)
+        rng.shuffle(expressions)
+        landmarks = {}
+        for expression in expressions:
+            points = base + rng.normal(0, 0.01, base.shape)
+            points[:, :2] = np.clip(points[:, :2], 0, 1)
+            landmarks[expression] = ExpressionLandmarks.from_detection_result(_DetectionResult(points), width, height)
+        user = {'eyelid_surgery': seed % 3 == 0, 'nasolabial_fold': bool(seed % 2),
+                'nasolabial_fold_only_paralyzed_side': seed % 4 == 1}
+        yield pytest.param(landmarks, user, expected, id=f"seed-{seed}")
+
+
+def _score(geometry: FaceGeometry, user: dict) -> dict:
+    service = SessionService(None)
+    try:
+        house_brackmann = service.get_house_brackmann_classif(geometry)
+        sunnybrook = service.get_sunnybrook_classif(geometry, user)
+    except Exception as e:
+        return {'error': type(e).__name__}
+    return {'hb': house_brackmann, 'sb': sunnybrook, **{name: getattr(service, name) for name in ATTRIBUTES}}
+
+
+@pytest.mark.parametrize("landmarks, user, expected", _cases())
+def test_scores_from_landmarks_match_the_reference(landmarks, user, expected):
+    assert _score(FaceGeometry.from_landmarks(landmarks), user) == expected
+
+
+@pytest.mark.parametrize("landmarks, user, expected", _cases())
+def test_scores_from_stored_features_match_the_reference(landmarks, user, expected):
+    features = {
+        expression: features_from_bytes(features_to_bytes(photo_features(expression_landmarks)))
+        for expression, expression_landmarks in landmarks.items()
+    }
+
+    assert _score(FaceGeometry.from_features(features), user) == expected
@@ -0,0 +1,37 @@
+from app.services.sessions_service import session_ids_query, session_results, sessions_query
+
+from tests.factories import make_result
+
+
+def test_first_page_has_no_lower_bound():
+    query, params = session_ids_query(7, None, 20)
+
+    assert "s.session_id <" not in query
+    assert params == (7, 20)
+
+
+def test_next_page_starts_below_the_last_session():
+    query, params = session_ids_query(7, 100, 20)
+
+    assert "and s.session_id < %s" in query
+    assert query.index("s.session_id < %s") < query.index("ORDER BY s.session_id DESC")
+    assert params == (7, 100, 20)
+
+
+def test_sessions_query_has_one_placeholder_per_session():
+    query, params = sessions_query([3, 2, 1])
+
+    assert "IN (%s, %s, %s)" in query
+    assert params == (3, 2, 1)
+
+
+def test_session_results_keep_the_page_order_and_attach_previews():
+    results = {1: make_result(1), 3: make_result(3)}
+    photos = [{"session_id": 3, "photo_id": "a"}, {"session_id": 1, "photo_id": "b"}, {"session_id": 3, "photo_id": "c"}]
+
+    page = session_results([3, 2, 1], results, photos)
+
+    assert [result.session_id for result in page] == [3, 1]
+    assert page[0].photos == ["/images/a?variant=preview", "/images/c?variant=preview"]
+    assert page[1].photos == ["/images/b?variant=preview"]
+    assert results[3].photos == []
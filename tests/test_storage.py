@@ -0,0 +1,92 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.storage import LocalStorage, S3Storage, Storage, shard_key
+
+KEY = "0123abcd-0000-0000-0000-000000000000.jpg"
+DATA = bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    with moto.mock_aws():
+        storage = S3Storage("assets", prefix="photos/", region="us-east-1")
+        storage.client.create_bucket(Bucket="assets")
+        yield storage
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request, tmp_path):
+    if request.param == "local":
+        return LocalStorage(str(tmp_path))
+    return request.getfixturevalue("s3_storage")
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
+
+
+def test_write_read_stat_delete(storage):
+    assert not storage.exists(KEY)
+
+    storage.write(KEY, DATA)
+
+    assert storage.exists(KEY)
+    assert storage.read(KEY) == DATA
+    assert storage.stat(KEY).size == len(DATA)
+
+    storage.delete(KEY)
+    assert not storage.exists(KEY)
+
+
+def test_missing_key_raises_file_not_found(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.read(KEY)
+    with pytest.raises(FileNotFoundError):
+        storage.stat(KEY)
+    with pytest.raises(FileNotFoundError):
+        list(storage.iter_range(KEY))
+
+
+@pytest.mark.parametrize("start, end", [(0, None), (0, 0), (100, 70000), (len(DATA) - 10, None)])
+def test_iter_range_returns_the_inclusive_range(storage, start, end):
+    storage.write(KEY, DATA)
+
+    content = b"".join(storage.iter_range(KEY, start, end))
+
+    assert content == DATA[start:None if end is None else end + 1]
+
+
+def test_stream_yields_the_range(storage):
+    storage.write(KEY, DATA)
+
+    async def collect():
+        return b"".join([chunk async for chunk in storage.stream(KEY, 10, 99)])
+
+    assert asyncio.run(collect()) == DATA[10:100]
+
+
+def test_s3_keys_are_sharded_under_the_prefix(s3_storage):
+    s3_storage.write(KEY, DATA)
+
+    keys = [item["Key"] for item in s3_storage.client.list_objects_v2(Bucket="assets")["Contents"]]
+
+    assert keys == [f"photos/{shard_key(KEY)}"]
+
+
+def test_local_storage_reads_keys_written_before_sharding(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    with open(tmp_path / KEY, "wb") as file:
+        file.write(DATA)
+
+    assert storage.exists(KEY)
+    assert storage.read(KEY) == DATA
+
+    storage.delete(KEY)
+    assert not os.path.exists(tmp_path / KEY)
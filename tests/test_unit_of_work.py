@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.db.unit_of_work import AsyncUnitOfWork, UnitOfWork
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params):
+        if query == "FAIL":
+            raise RuntimeError("falha")
+        self.connection.calls.append(("execute", query, params))
+
+    def executemany(self, query, rows):
+        self.connection.calls.append(("executemany", query, list(rows)))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.calls = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeAsyncCursor(FakeCursor):
+    async def execute(self, query, params):
+        super().execute(query, params)
+
+    async def executemany(self, query, rows):
+        super().executemany(query, rows)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeAsyncConnection(FakeConnection):
+    def cursor(self):
+        return FakeAsyncCursor(self)
+
+    async def commit(self):
+        super().commit()
+
+    async def rollback(self):
+        super().rollback()
+
+
+def test_rows_of_a_statement_are_sent_together_in_first_queued_order():
+    connection = FakeConnection()
+
+    with UnitOfWork(connection) as unit_of_work:
+        unit_of_work.add("INSERT photo", (1,))
+        unit_of_work.add("UPDATE session", ("processed", 9))
+        unit_of_work.add_many("INSERT photo", [(2,), (3,)])
+
+    assert connection.calls == [
+        ("executemany", "INSERT photo", [(1,), (2,), (3,)]),
+        ("execute", "UPDATE session", ("processed", 9)),
+    ]
+    assert connection.commits == 1
+
+
+def test_nothing_is_written_when_the_block_raises():
+    connection = FakeConnection()
+
+    with pytest.raises(ValueError):
+        with UnitOfWork(connection) as unit_of_work:
+            unit_of_work.add("INSERT photo", (1,))
+            raise ValueError()
+
+    assert connection.calls == []
+    assert connection.commits == 0
+
+
+def test_a_failed_write_is_rolled_back():
+    connection = FakeConnection()
+
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(connection) as unit_of_work:
+            unit_of_work.add("INSERT photo", (1,))
+            unit_of_work.add("FAIL", ())
+
+    assert connection.commits == 0
+    assert connection.rollbacks == 1
+
+
+def test_async_unit_of_work_groups_and_rolls_back_the_same_way():
+    connection = FakeAsyncConnection()
+
+    async def run():
+        async with AsyncUnitOfWork(connection) as unit_of_work:
+            unit_of_work.add_many("INSERT photo", [(1,), (2,)])
+            unit_of_work.add("UPDATE session", ("pending", 9))
+        with pytest.raises(RuntimeError):
+            async with AsyncUnitOfWork(connection) as unit_of_work:
+                unit_of_work.add("FAIL", ())
+
+    asyncio.run(run())
+
+    assert connection.calls == [
+        ("executemany", "INSERT photo", [(1,), (2,)]),
+        ("execute", "UPDATE session", ("pending", 9)),
+    ]
+    assert (connection.commits, connection.rollbacks) == (1, 1)